@@ -0,0 +1,86 @@
+# times scraping the rows of a saved 50 row giveaway list page:
+#
+#   python -m benchmarks.giveaway_entry [--backend html.parser] [--rounds 50]
+#
+# 'per field' scrapes each field with its own traversal and works the times out with time.localtime/mktime, and
+# writes each row's html for the debug log, like GiveawayEntry used to. 'single pass' is GiveawayEntry as it is
+# now with every row scraped in full. 'cheap checks only' leaves out load_details(), like rows that fail the
+# cheap checks
+import argparse
+import logging
+import os
+import re
+import tempfile
+import time
+from timeit import timeit
+
+os.environ.setdefault('BOT_CONFIG_DIR', tempfile.mkdtemp(prefix='steamgifts-bot-bench-'))
+
+from src.bot.giveaway_entry import GiveawayEntry  # noqa: E402
+from src.bot.html_parser import HtmlParser  # noqa: E402
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tests', 'fixtures', 'search.html')
+ROWS = 50
+
+
+def _minutes(timestamp):
+    return int(abs((time.mktime(time.localtime(int(timestamp))) - time.mktime(time.localtime())) / 60))
+
+
+def _scrape_per_field(item):
+    str(item)
+    row = {'steam_url': item.select('a.giveaway__icon')[0]['href'],
+           'game_name': item.find('a', {'class': 'giveaway__heading__name'}).text,
+           'giveaway_game_id': item.find('a', {'class': 'giveaway__heading__name'})['href'].split('/')[2],
+           'giveaway_uri': item.select_one('a.giveaway__heading__name')['href'],
+           'pinned': item.parent.parent.get('class'),
+           'headers': [h.getText() for h in item.find_all('span', {'class': 'giveaway__heading__thin'})],
+           'game_entries': int(item.select('div.giveaway__links span')[0].text.split(' ')[0].replace(',', '')),
+           'contributor_level': item.select_one('div[title="Contributor Level"]'),
+           'user': item.select_one('a.giveaway__username').text}
+    row['steam_app_id'] = re.search('^.+/[a-z0-9]+/(?P<steam_app_id>[0-9]+)/$', row['steam_url'], re.IGNORECASE)
+    times = item.select('div span[data-timestamp]')
+    for t in times[:2]:
+        re.search('^[0-9]+$', t['data-timestamp'])
+        _minutes(t['data-timestamp'])
+    return row
+
+
+def _scrape_single_pass(rows, now):
+    for item in rows:
+        GiveawayEntry(item, now).load_details()
+
+
+def _scrape_summaries(rows, now):
+    for item in rows:
+        GiveawayEntry(item, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times scraping the rows of a 50 row giveaway list page.')
+    parser.add_argument('--backend', default='html.parser', help='html.parser, lxml or lexbor')
+    parser.add_argument('--rounds', type=int, default=50, help='times each page is scraped')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    html_parser = HtmlParser(args.backend)
+    with open(PAGE, encoding='utf-8') as f:
+        soup = html_parser.parse(f.read())
+    rows = soup.select('div.giveaway__row-inner-wrap')[:ROWS]
+    now = time.time()
+
+    results = [('single pass', timeit(lambda: _scrape_single_pass(rows, now), number=args.rounds)),
+               ('cheap checks only', timeit(lambda: _scrape_summaries(rows, now), number=args.rounds))]
+    if html_parser.backend != 'lexbor':
+        # the old scraper used BeautifulSoup's own api so it can't run on lexbor trees
+        tags = [row._tag for row in rows]
+        results.insert(0, ('per field', timeit(lambda: [_scrape_per_field(t) for t in tags], number=args.rounds)))
+
+    print(f"{len(rows)} rows with '{html_parser.backend}', {args.rounds} rounds")
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"  {name:<18} {seconds / args.rounds * 1000:8.2f}ms per page  {baseline / seconds:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
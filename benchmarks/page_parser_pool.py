@@ -0,0 +1,69 @@
+# times parsing a directory of saved giveaway list pages in the bot's process and on 1 and N parser processes:
+#
+#   python -m benchmarks.page_parser_pool [--pages tests/fixtures] [--workers 4] [--copies 10]
+#
+# pages are handed to the pool from as many threads as there are workers, the way the page prefetcher does
+import argparse
+import glob
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer
+
+os.environ.setdefault('BOT_CONFIG_DIR', tempfile.mkdtemp(prefix='steamgifts-bot-bench-'))
+
+from src.bot import page_parser_pool  # noqa: E402
+from src.bot.page_parser_pool import PageParserPool  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tests', 'fixtures')
+
+
+def _read_pages(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+def _time(parse, pages, threads):
+    now = time.time()
+    started = default_timer()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        rows = sum(len(page.giveaways) for page in executor.map(lambda markup: parse(markup, now), pages))
+    return default_timer() - started, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times parsing saved giveaway list pages on 1 vs N processes.')
+    parser.add_argument('--pages', default=FIXTURES, help='directory of saved pages (*.html)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='parser processes to compare with 1')
+    parser.add_argument('--copies', type=int, default=10, help='times each page is parsed')
+    parser.add_argument('--backend', default='html.parser', help='html.parser, lxml or lexbor')
+    args = parser.parse_args()
+
+    pages = _read_pages(args.pages) * args.copies
+    if not pages:
+        parser.error(f"no *.html pages in {args.pages}")
+
+    page_parser_pool._init_worker(args.backend)
+    results = [('in process', *_time(page_parser_pool.parse_giveaway_list, pages, 1))]
+    for workers in sorted({1, args.workers}):
+        pool = PageParserPool(args.backend, workers)
+        try:
+            # the first page of every worker pays for starting the process, so leave it out of the timing
+            _time(pool.parse, pages[:workers], workers)
+            results.append((f"{workers} worker(s)", *_time(pool.parse, pages, workers)))
+        finally:
+            pool.shutdown()
+
+    print(f"{len(pages)} pages from {args.pages} with '{args.backend}'")
+    baseline = results[0][1]
+    for name, seconds, rows in results:
+        print(f"  {name:<12} {seconds:7.2f}s  {len(pages) / seconds:7.1f} pages/s  {rows} rows  "
+              f"{baseline / seconds:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
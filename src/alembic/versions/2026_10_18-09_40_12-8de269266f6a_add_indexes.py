@@ -0,0 +1,30 @@
+"""add indexes
+
+Revision ID: 8de269266f6a
+Revises: 8c1784114d65
+Create Date: 2026-10-18 09:40:12.318204
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8de269266f6a'
+down_revision = '8c1784114d65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # lookups by giveaway_id alone are already served by the primary key's index as giveaway_id is its
+    # leading column, so it doesn't get one of its own
+    op.create_index('ix_giveaway_entered', 'giveaway', ['entered'])
+    op.create_index('ix_giveaway_won', 'giveaway', ['won'])
+    op.create_index('ix_giveaway_giveaway_ended_at', 'giveaway', ['giveaway_ended_at'])
+    op.create_index('ix_notification_type_created_at', 'notification', ['type', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_type_created_at', table_name='notification')
+    op.drop_index('ix_giveaway_giveaway_ended_at', table_name='giveaway')
+    op.drop_index('ix_giveaway_won', table_name='giveaway')
+    op.drop_index('ix_giveaway_entered', table_name='giveaway')
@@ -0,0 +1,37 @@
+"""add giveaway stats
+
+Revision ID: bb4b2c65a43c
+Revises: 8de269266f6a
+Create Date: 2026-10-18 09:52:37.604118
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'bb4b2c65a43c'
+down_revision = '8de269266f6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('giveaway_stats',
+                    sa.Column('day', sa.Date(), nullable=False),
+                    sa.Column('giveaways', sa.Integer(), nullable=False),
+                    sa.Column('entered', sa.Integer(), nullable=False),
+                    sa.Column('won', sa.Integer(), nullable=False),
+                    sa.Column('points_spent', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('day')
+                    )
+    # fill it from the giveaways already recorded. when they were entered or won isn't stored, so those are
+    # counted on the day the giveaway was first recorded. the same as `python main.py --rebuild-stats`
+    op.execute("INSERT INTO giveaway_stats (day, giveaways, entered, won, points_spent) "
+               "SELECT DATE(COALESCE(created_at, giveaway_created_at)), COUNT(*), "
+               "SUM(CASE WHEN entered THEN 1 ELSE 0 END), SUM(CASE WHEN won THEN 1 ELSE 0 END), "
+               "SUM(CASE WHEN entered THEN cost ELSE 0 END) "
+               "FROM giveaway GROUP BY DATE(COALESCE(created_at, giveaway_created_at));")
+
+
+def downgrade():
+    op.drop_table('giveaway_stats')
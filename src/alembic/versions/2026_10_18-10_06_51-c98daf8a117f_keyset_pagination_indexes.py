@@ -0,0 +1,29 @@
+"""keyset pagination indexes
+
+Revision ID: c98daf8a117f
+Revises: bb4b2c65a43c
+Create Date: 2026-10-18 10:06:51.277340
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c98daf8a117f'
+down_revision = 'bb4b2c65a43c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the web ui pages through giveaways on (giveaway_ended_at, giveaway_id) and notifications on (created_at, id).
+    # indexes on both columns let a page be read straight off the index instead of sorting every row after the
+    # cursor. the giveaway one replaces the giveaway_ended_at index as it serves the same queries
+    op.drop_index('ix_giveaway_giveaway_ended_at', table_name='giveaway')
+    op.create_index('ix_giveaway_giveaway_ended_at_giveaway_id', 'giveaway', ['giveaway_ended_at', 'giveaway_id'])
+    op.create_index('ix_notification_created_at_id', 'notification', ['created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_created_at_id', table_name='notification')
+    op.drop_index('ix_giveaway_giveaway_ended_at_giveaway_id', table_name='giveaway')
+    op.create_index('ix_giveaway_giveaway_ended_at', 'giveaway', ['giveaway_ended_at'])
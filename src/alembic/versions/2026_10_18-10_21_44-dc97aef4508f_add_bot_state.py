@@ -0,0 +1,29 @@
+"""add bot state
+
+Revision ID: dc97aef4508f
+Revises: c98daf8a117f
+Create Date: 2026-10-18 10:21:44.815530
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'dc97aef4508f'
+down_revision = 'c98daf8a117f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bot_state',
+                    sa.Column('key', sa.String(length=50), nullable=False),
+                    sa.Column('value', sa.String(length=200), nullable=False),
+                    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                              nullable=True),
+                    sa.PrimaryKeyConstraint('key')
+                    )
+
+
+def downgrade():
+    op.drop_table('bot_state')
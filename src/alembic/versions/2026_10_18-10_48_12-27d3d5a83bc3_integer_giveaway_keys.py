@@ -0,0 +1,152 @@
+"""integer giveaway keys
+
+Revision ID: 27d3d5a83bc3
+Revises: dc97aef4508f
+Create Date: 2026-10-18 10:48:12.406213
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '27d3d5a83bc3'
+down_revision = 'dc97aef4508f'
+branch_labels = None
+depends_on = None
+
+# rows copied per statement when the tables are rewritten
+BATCH_SIZE = 1000
+
+GIVEAWAY_COLUMNS = ('giveaway_id', 'steam_id', 'giveaway_uri', 'user', 'giveaway_created_at', 'giveaway_ended_at',
+                    'cost', 'copies', 'contributor_level', 'entered', 'won', 'game_entries', 'created_at',
+                    'updated_at')
+STEAM_ITEM_COLUMNS = ('steam_id', 'game_name', 'steam_url', 'created_at', 'updated_at')
+
+
+def _create_steam_item(name, steam_id_type):
+    op.create_table(name,
+                    sa.Column('steam_id', steam_id_type, nullable=False),
+                    sa.Column('game_name', sa.String(length=200), nullable=False),
+                    sa.Column('steam_url', sa.String(length=100), nullable=False),
+                    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                              nullable=True),
+                    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                              nullable=True),
+                    sa.PrimaryKeyConstraint('steam_id')
+                    )
+
+
+def _giveaway_columns():
+    return [sa.Column('giveaway_id', sa.String(length=10), nullable=False),
+            sa.Column('steam_id', sa.Integer(), nullable=False),
+            sa.Column('giveaway_uri', sa.String(length=200), nullable=False),
+            sa.Column('user', sa.String(length=40), nullable=False),
+            sa.Column('giveaway_created_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('giveaway_ended_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('cost', sa.Integer(), nullable=False),
+            sa.Column('copies', sa.Integer(), nullable=False),
+            sa.Column('contributor_level', sa.Integer(), nullable=False),
+            sa.Column('entered', sa.Boolean(), nullable=False),
+            sa.Column('won', sa.Boolean(), nullable=False),
+            sa.Column('game_entries', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                      nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                      nullable=True)]
+
+
+# copies every row of `source` into `target` BATCH_SIZE rows at a time, walking `source` in `key` order so each
+# batch is read straight off an index. `convert` turns a source row into the target row, or None to drop it
+def _copy_in_batches(source, target, columns, key, convert):
+    connection = op.get_bind()
+    source_table = sa.table(source, *[sa.column(c) for c in columns])
+    target_table = sa.table(target, *[sa.column(c) for c in columns])
+    last = None
+    while True:
+        query = sa.select(*source_table.c).order_by(source_table.c[key]).limit(BATCH_SIZE)
+        if last is not None:
+            query = query.where(source_table.c[key] > last)
+        rows = connection.execute(query).mappings().all()
+        if not rows:
+            return
+        converted = [row for row in (convert(dict(row)) for row in rows) if row is not None]
+        if converted:
+            connection.execute(sa.insert(target_table), converted)
+        last = rows[-1][key]
+
+
+def _to_integer_steam_id(row):
+    row['steam_id'] = int(row['steam_id'])
+    return row
+
+
+def _to_string_steam_id(row):
+    row['steam_id'] = str(row['steam_id'])
+    return row
+
+
+def _drop_giveaway_indexes(names):
+    for name in names:
+        op.drop_index(name, table_name='giveaway')
+
+
+def upgrade():
+    # steam_item.steam_id was a string while giveaway.steam_id was an integer pointing at it, so every join
+    # compared the two types, and giveaways were keyed on (code, steam id) when the code alone is unique. both
+    # tables are rebuilt with integer steam ids, and giveaways get an integer id with a unique index on the code.
+    # the rows are copied across in batches so a large database isn't read into memory in one go
+    _create_steam_item('steam_item_new', sa.Integer())
+    _copy_in_batches('steam_item', 'steam_item_new', STEAM_ITEM_COLUMNS, 'steam_id', _to_integer_steam_id)
+
+    op.create_table('giveaway_new',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    *_giveaway_columns(),
+                    sa.ForeignKeyConstraint(['steam_id'], ['steam_item_new.steam_id'], ),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    # the code was only unique together with the steam id before. it never repeats on steamgifts.com but only
+    # the first row of a code is kept in case it ever did
+    seen_codes = set()
+
+    def to_new_giveaway(row):
+        if row['giveaway_id'] in seen_codes:
+            return None
+        seen_codes.add(row['giveaway_id'])
+        return _to_integer_steam_id(row)
+
+    _copy_in_batches('giveaway', 'giveaway_new', GIVEAWAY_COLUMNS, 'giveaway_id', to_new_giveaway)
+
+    _drop_giveaway_indexes(['ix_giveaway_entered', 'ix_giveaway_won', 'ix_giveaway_giveaway_ended_at_giveaway_id'])
+    op.drop_table('giveaway')
+    op.drop_table('steam_item')
+    op.rename_table('steam_item_new', 'steam_item')
+    op.rename_table('giveaway_new', 'giveaway')
+
+    op.create_index('ix_giveaway_giveaway_id', 'giveaway', ['giveaway_id'], unique=True)
+    op.create_index('ix_giveaway_entered', 'giveaway', ['entered'])
+    op.create_index('ix_giveaway_won', 'giveaway', ['won'])
+    # the web ui now pages through giveaways on (giveaway_ended_at, id)
+    op.create_index('ix_giveaway_giveaway_ended_at_id', 'giveaway', ['giveaway_ended_at', 'id'])
+
+
+def downgrade():
+    _create_steam_item('steam_item_old', sa.String(length=15))
+    _copy_in_batches('steam_item', 'steam_item_old', STEAM_ITEM_COLUMNS, 'steam_id', _to_string_steam_id)
+
+    op.create_table('giveaway_old',
+                    *_giveaway_columns(),
+                    sa.ForeignKeyConstraint(['steam_id'], ['steam_item_old.steam_id'], ),
+                    sa.PrimaryKeyConstraint('giveaway_id', 'steam_id')
+                    )
+    _copy_in_batches('giveaway', 'giveaway_old', GIVEAWAY_COLUMNS, 'giveaway_id', lambda row: row)
+
+    _drop_giveaway_indexes(['ix_giveaway_giveaway_id', 'ix_giveaway_entered', 'ix_giveaway_won',
+                            'ix_giveaway_giveaway_ended_at_id'])
+    op.drop_table('giveaway')
+    op.drop_table('steam_item')
+    op.rename_table('steam_item_old', 'steam_item')
+    op.rename_table('giveaway_old', 'giveaway')
+
+    op.create_index('ix_giveaway_entered', 'giveaway', ['entered'])
+    op.create_index('ix_giveaway_won', 'giveaway', ['won'])
+    op.create_index('ix_giveaway_giveaway_ended_at_giveaway_id', 'giveaway', ['giveaway_ended_at', 'giveaway_id'])
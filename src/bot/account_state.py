@@ -0,0 +1,68 @@
+import threading
+from time import monotonic
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class AccountState:
+
+    def __init__(self, ttl_seconds=300):
+        self._lock = threading.Lock()
+        self._ttl_seconds = ttl_seconds
+        self._refreshed_at = None
+        self._points_updated_at = None
+        self.xsrf_token = None
+        self.points = None
+        self.contributor_level = None
+        self.number_won = None
+
+    def is_stale(self):
+        with self._lock:
+            return self._refreshed_at is None or monotonic() - self._refreshed_at > self._ttl_seconds
+
+    # every steamgifts.com page carries the nav bar, so any page we already fetched can refresh the state.
+    # returns False when the nav bar doesn't contain the account details, i.e. the cookie is not valid
+    # `fetched_at` is when the page was requested so a prefetched page can't overwrite newer points
+    def update_from_soup(self, soup, fetched_at=None):
+        nav = AccountState.read_nav(soup)
+        if nav is None:
+            return False
+        self.update(*nav, fetched_at=fetched_at)
+        return True
+
+    # returns (xsrf token, points, contributor level, number won) from the nav bar or None if it isn't there
+    @staticmethod
+    def read_nav(soup):
+        try:
+            xsrf_token = soup.select_one('input[name=xsrf_token]')['value']
+            points = int(soup.select_one('span.nav__points').text)  # storage points
+            contributor_level = int(float(soup.select_one('nav a>span[title]')['title']))
+        except (TypeError, AttributeError):
+            return None
+
+        won = soup.select_one("a[title='Giveaways Won'] div")
+        number_won = int(won.text) if won else 0
+        return xsrf_token, points, contributor_level, number_won
+
+    def update(self, xsrf_token, points, contributor_level, number_won, fetched_at=None):
+        if fetched_at is None:
+            fetched_at = monotonic()
+        with self._lock:
+            self.xsrf_token = xsrf_token
+            self.contributor_level = contributor_level
+            self.number_won = number_won
+            self._refreshed_at = monotonic()
+            if self._points_updated_at is None or fetched_at >= self._points_updated_at:
+                self.points = points
+                self._points_updated_at = fetched_at
+        logger.debug(f"Account state refreshed: {points}P, level {contributor_level}, {number_won} won")
+
+    def update_points(self, points):
+        with self._lock:
+            self.points = int(str(points).replace(',', ''))
+            self._points_updated_at = monotonic()
+
+    def __str__(self):
+        return str(self.__class__) + ": " + str(self.__dict__)
@@ -0,0 +1,35 @@
+import re
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _split(values):
+    return [v.strip() for v in (values or '').split(',') if v.strip()]
+
+
+class Blacklist:
+
+    # built once from the config and shared by every runner. all keywords are combined into a single
+    # case-insensitive regex so a game name is scanned once no matter how many keywords there are
+    def __init__(self, keywords='', whole_words='', steam_app_ids='', users=''):
+        patterns = [re.escape(k) for k in _split(keywords)]
+        patterns += [f"(?<!\\w){re.escape(w)}(?!\\w)" for w in _split(whole_words)]
+        self._pattern = re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
+        self._steam_app_ids = frozenset(_split(steam_app_ids))
+        self._users = frozenset(u.lower() for u in _split(users))
+        logger.debug(f"Blacklist built from {len(patterns)} keyword(s), {len(self._steam_app_ids)} steam app id(s) "
+                     f"and {len(self._users)} user(s)")
+
+    # returns why the giveaway is blacklisted or None if it isn't
+    def reason(self, giveaway):
+        if giveaway.steam_app_id is not None and giveaway.steam_app_id in self._steam_app_ids:
+            return f"is for the blacklisted steam app {giveaway.steam_app_id}"
+        if giveaway.user is not None and giveaway.user.lower() in self._users:
+            return f"was created by the blacklisted user {giveaway.user}"
+        if self._pattern is not None:
+            match = self._pattern.search(giveaway.game_name)
+            if match:
+                return f"contains the blacklisted keyword {match.group(0)}"
+        return None
@@ -33,13 +33,26 @@ class ConfigReader(ConfigParser):
             'minimum_points': '%s' % (value_range(0, 400)),
             'max_entries': '%s' % (value_range(0, 100000)),
             'max_time_left': '%s' % (value_range(0, 21600)),
-            'minimum_game_points': '%s' % (value_range(0, 50))
+            'minimum_game_points': '%s' % (value_range(0, 50)),
+            'html_parser': ('html.parser', 'lxml', 'lexbor'),
+            'record_rejected_giveaways': ('true', 'false'),
+            'scan_max_pages': '%s' % (value_range(1, 100)),
+            'scan_max_rows': '%s' % (value_range(0, 5000)),
+            'scan_max_minutes': '%s' % (value_range(0, 600)),
+            'parse_workers': '%s' % (value_range(0, 32)),
+            'plan_entries': ('true', 'false'),
+            'requests_per_minute': '%s' % (value_range(1, 120)),
+            'request_burst': '%s' % (value_range(1, 20)),
+            'request_jitter_seconds': '%s' % (value_range(0, 30)),
+            'seen_cache_size': '%s' % (value_range(0, 100000)),
+            'seen_cache_minutes': '%s' % (value_range(1, 1440))
         },
         'WISHLIST': {
             'wishlist.enabled': ('true', 'false'),
             'wishlist.minimum_points': '%s' % (value_range(0, 400)),
             'wishlist.max_entries': '%s' % (value_range(0, 100000)),
-            'wishlist.max_time_left': '%s' % (value_range(0, 21600))
+            'wishlist.max_time_left': '%s' % (value_range(0, 21600)),
+            'wishlist.weight': '%s' % (value_range(1, 10))
         },
         'NOTIFICATIONS': {
             'pushover.enabled': ('true', 'false'),
@@ -47,6 +60,15 @@ class ConfigReader(ConfigParser):
         'WEB': {
             'web.enabled': ('true', 'false'),
             'web.port': '%s' % (value_range(1, 65535))
+        },
+        'DATABASE': {
+            'database.pool_size': '%s' % (value_range(1, 50)),
+            'database.max_overflow': '%s' % (value_range(0, 50)),
+            'database.pool_timeout': '%s' % (value_range(1, 300)),
+            'database.busy_timeout': '%s' % (value_range(0, 300)),
+            'database.write_queue_size': '%s' % (value_range(1, 100000)),
+            'database.write_batch_size': '%s' % (value_range(1, 1000)),
+            'database.write_flush_seconds': '%s' % (value_range(0, 60))
         }
     }
     default_values = {
@@ -58,13 +80,29 @@ class ConfigReader(ConfigParser):
             'max_entries': f"{randint(1000, 2500)}",
             'max_time_left': f"{randint(180, 500)}",
             'minimum_game_points': "0",
-            'blacklist_keywords': 'hentai,adult'
+            'blacklist_keywords': 'hentai,adult',
+            'blacklist_whole_words': '',
+            'blacklist_steam_app_ids': '',
+            'blacklist_users': '',
+            'html_parser': 'html.parser',
+            'record_rejected_giveaways': 'false',
+            'scan_max_pages': '2',
+            'scan_max_rows': '0',
+            'scan_max_minutes': '0',
+            'parse_workers': '0',
+            'plan_entries': 'false',
+            'requests_per_minute': '10',
+            'request_burst': '3',
+            'request_jitter_seconds': '4',
+            'seen_cache_size': '5000',
+            'seen_cache_minutes': '180'
         },
         'WISHLIST': {
             'wishlist.enabled': 'true',
             'wishlist.minimum_points': '1',
             'wishlist.max_entries': f"{randint(10000, 100000)}",
-            'wishlist.max_time_left': f"{randint(180, 500)}"
+            'wishlist.max_time_left': f"{randint(180, 500)}",
+            'wishlist.weight': '1'
         },
         'NOTIFICATIONS': {
             'notification.prefix': '',
@@ -81,6 +119,15 @@ class ConfigReader(ConfigParser):
             'web.basic_auth': 'true',
             'web.basic_auth.username': 'admin',
             'web.basic_auth.password': 'p@ssw0rd'
+        },
+        'DATABASE': {
+            'database.pool_size': '5',
+            'database.max_overflow': '10',
+            'database.pool_timeout': '30',
+            'database.busy_timeout': '15',
+            'database.write_queue_size': '2000',
+            'database.write_batch_size': '200',
+            'database.write_flush_seconds': '2'
         }
     }
     deprecated_values = {
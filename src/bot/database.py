@@ -1,21 +1,120 @@
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
-import paginate_sqlalchemy
 import sqlalchemy
 from alembic import command
 from alembic.config import Config
 from dateutil import tz
-from sqlalchemy import func, select
+from sqlalchemy import case, delete, event, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.pool import QueuePool
 from sqlalchemy_utils import database_exists
 
 from .log import get_logger
-from .models import TableNotification, TableGiveaway, TableSteamItem
+from .models import TableNotification, TableGiveaway, TableSteamItem, TableGiveawayStats, TableBotState
 
 logger = get_logger(__name__)
-engine = sqlalchemy.create_engine(f"{os.getenv('BOT_DB_URL', 'sqlite:///./config/sqlite.db')}", echo=False)
-engine.connect()
+# the databases with an INSERT ... ON CONFLICT that bulk_upsert can use
+DIALECT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+# rows per INSERT statement so a statement stays well under sqlite's limit on bound parameters
+BULK_UPSERT_CHUNK_SIZE = 50
+STATS_COLUMNS = ('giveaways', 'entered', 'won', 'points_spent')
+PAGE_SIZE = 20
+# the most steam app ids SteamItemHelper keeps in memory. far more than the bot sees in months of running
+STEAM_ITEM_CACHE_SIZE = 20000
+db_url = f"{os.getenv('BOT_DB_URL', 'sqlite:///./config/sqlite.db')}"
+# sqlite page cache per connection in KiB and how much of the database file may be memory mapped in bytes
+SQLITE_CACHE_SIZE_KIB = 16384
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024
+
+
+# the one place engines are made. the bot, the web server and the scheduler's job store all share the engine it
+# returns so they share a connection pool. sqlite files get WAL so the web ui can read while the bot writes
+def create_db_engine(url, pool_size=5, max_overflow=10, pool_timeout=30, busy_timeout_seconds=15):
+    url = sqlalchemy.engine.make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return sqlalchemy.create_engine(url, echo=False, pool_size=pool_size, max_overflow=max_overflow,
+                                        pool_timeout=pool_timeout, pool_pre_ping=True)
+
+    if url.database in (None, '', ':memory:'):
+        return sqlalchemy.create_engine(url, echo=False)
+    # sqlalchemy doesn't pool sqlite file connections by default. pooling them across threads is safe as a
+    # connection is only ever used by one thread at a time
+    sqlite_engine = sqlalchemy.create_engine(url, echo=False, poolclass=QueuePool, pool_size=pool_size,
+                                             max_overflow=max_overflow, pool_timeout=pool_timeout,
+                                             connect_args={'check_same_thread': False})
+
+    @event.listens_for(sqlite_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_seconds * 1000)}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = create_db_engine(db_url)
+
+
+# swaps the engine for one with the pool settings from config.ini. called once the config has been read
+def configure_engine(database_config):
+    global engine
+    engine.dispose()
+    engine = create_db_engine(db_url,
+                              pool_size=database_config.getint('database.pool_size'),
+                              max_overflow=database_config.getint('database.max_overflow'),
+                              pool_timeout=database_config.getint('database.pool_timeout'),
+                              busy_timeout_seconds=database_config.getint('database.busy_timeout'))
+    logger.debug(f"Database engine configured: {engine.pool.status()}")
+
+
+def get_engine():
+    return engine
+
+
+class KeysetPage:
+    # a page of rows ordered newest first. next_page and previous_page are the cursors to pass back as `after`
+    # and `before` to get the pages either side, or None when there isn't one
+
+    def __init__(self, items, next_page, previous_page):
+        self.items = items
+        self.next_page = next_page
+        self.previous_page = previous_page
+
+
+# pages through `query` newest first on (order_column, id_column) by starting from the row a cursor points at
+# instead of counting and skipping rows, so every page costs the same however deep it is. the cursor is the id
+# of the row and its sort value is looked up by the database itself. both columns need to be indexed together
+def keyset_page(query, order_column, id_column, after=None, before=None, page_size=PAGE_SIZE):
+    cursor = after if after is not None else before
+    if cursor is not None:
+        pivot = tuple_(select(order_column).where(id_column == cursor).limit(1).scalar_subquery(), cursor)
+        if after is not None:
+            query = query.filter(tuple_(order_column, id_column) < pivot)
+        else:
+            query = query.filter(tuple_(order_column, id_column) > pivot)
+    if before is not None:
+        # walk towards the newer rows and flip them back into newest first order
+        rows = query.order_by(order_column.asc(), id_column.asc()).limit(page_size + 1).all()
+        more = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        next_page, previous_page = True, more
+    else:
+        rows = query.order_by(order_column.desc(), id_column.desc()).limit(page_size + 1).all()
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_page, previous_page = more, after is not None
+    key = id_column.key
+    return KeysetPage(rows,
+                      getattr(rows[-1], key) if rows and next_page else None,
+                      getattr(rows[0], key) if rows and previous_page else None)
 
 
 def run_db_migrations(script_location: str, db_url: str) -> None:
@@ -46,9 +145,10 @@ def run_db_migrations(script_location: str, db_url: str) -> None:
 class NotificationHelper:
 
     @classmethod
-    def get(cls):
+    def page(cls, after=None, before=None):
         with Session(engine) as session:
-            return session.query(TableNotification).order_by(TableNotification.created_at.desc()).all()
+            return keyset_page(session.query(TableNotification), TableNotification.created_at, TableNotification.id,
+                               after, before)
 
     @classmethod
     def insert(cls, type_of_error, message, medium, success, number_won):
@@ -89,42 +189,61 @@ class NotificationHelper:
                 .all()
 
 
-class GiveawayHelper:
+class SteamItemHelper:
 
-    @classmethod
-    def get(cls):
-        with Session(engine) as session:
-            return session.query(TableGiveaway).options(joinedload('steam_item')) \
-                .order_by(TableGiveaway.giveaway_ended_at.desc()).all()
+    # the steam app ids known to have a steam_item row, so writing a giveaway doesn't have to look its game up
+    # first. warmed from the table at startup and added to once a new row is committed. the least recently used
+    # ids are dropped past STEAM_ITEM_CACHE_SIZE, which only means they are looked up again
+    _known = OrderedDict()
+    _lock = threading.Lock()
 
     @classmethod
-    def paginate(cls, page=1):
+    def warm(cls):
         with Session(engine) as session:
-            paginated_giveaways = paginate_sqlalchemy.SqlalchemyOrmPage(session.query(TableGiveaway)
-                                                                        .options(joinedload('steam_item'))
-                                                                        .order_by(
-                TableGiveaway.giveaway_ended_at.desc()), page=page)
-            return paginated_giveaways
+            steam_ids = session.execute(select(TableSteamItem.steam_id)
+                                        .order_by(TableSteamItem.created_at.desc())
+                                        .limit(STEAM_ITEM_CACHE_SIZE)).scalars().all()
+        with cls._lock:
+            cls._known.clear()
+        SteamItemHelper.remember(reversed(steam_ids))
+        logger.debug(f"Loaded {len(steam_ids)} known steam items")
 
     @classmethod
-    def total_giveaways(cls):
-        with Session(engine) as session:
-            return session.execute(select(func.count(TableGiveaway.giveaway_id))).scalar_one()
+    def is_known(cls, steam_id):
+        with cls._lock:
+            if steam_id in cls._known:
+                cls._known.move_to_end(steam_id)
+                return True
+            return False
 
     @classmethod
-    def total_entered(cls):
-        with Session(engine) as session:
-            return session.query(TableGiveaway).filter_by(entered=True).count()
+    def remember(cls, steam_ids):
+        with cls._lock:
+            for steam_id in steam_ids:
+                cls._known[steam_id] = None
+                cls._known.move_to_end(steam_id)
+            while len(cls._known) > STEAM_ITEM_CACHE_SIZE:
+                cls._known.popitem(last=False)
+
+
+class GiveawayHelper:
 
     @classmethod
-    def total_won(cls):
+    def page(cls, after=None, before=None):
         with Session(engine) as session:
-            return session.query(TableGiveaway).filter_by(won=True).count()
+            return keyset_page(session.query(TableGiveaway).options(joinedload('steam_item')),
+                               TableGiveaway.giveaway_ended_at, TableGiveaway.id, after, before)
 
+    # the cursor of what used to be page number `page`, so links from before the keyset pages still open about
+    # the same rows. it skips the rows in front like the numbered pages did, but only old links ever ask for it
     @classmethod
-    def get_by_giveaway_id(cls, game_id):
+    def page_cursor(cls, page, page_size=PAGE_SIZE):
+        if page <= 1:
+            return None
         with Session(engine) as session:
-            return session.query(TableGiveaway).filter_by(giveaway_id=game_id).one_or_none()
+            return session.query(TableGiveaway.id) \
+                .order_by(TableGiveaway.giveaway_ended_at.desc(), TableGiveaway.id.desc()) \
+                .offset((page - 1) * page_size - 1).limit(1).scalar()
 
     @classmethod
     def unix_timestamp_to_utc_datetime(cls, timestamp):
@@ -133,34 +252,65 @@ class GiveawayHelper:
     @classmethod
     def get_by_ids(cls, giveaway):
         with Session(engine) as session:
-            return session.query(TableGiveaway).filter_by(giveaway_id=giveaway.giveaway_game_id,
-                                                          steam_id=giveaway.steam_app_id).all()
+            return session.query(TableGiveaway).filter_by(giveaway_id=giveaway.giveaway_game_id).all()
+
+    # steam app ids are scraped as text and stored as integers
+    @classmethod
+    def steam_id(cls, giveaway):
+        return int(giveaway.steam_app_id)
+
+    # marks every entered giveaway in `game_ids` that isn't already won as won with a single UPDATE. returns the
+    # ids of the giveaways that were marked
+    @classmethod
+    def mark_games_as_won(cls, game_ids):
+        return GiveawayHelper._mark_games(game_ids, 'won', TableGiveaway.entered & ~TableGiveaway.won)
+
+    # the same for giveaways steamgifts.com lists as entered that aren't recorded as entered yet
+    @classmethod
+    def mark_games_as_entered(cls, game_ids):
+        return GiveawayHelper._mark_games(game_ids, 'entered', ~TableGiveaway.entered)
+
+    @classmethod
+    def _mark_games(cls, game_ids, flag, unmarked):
+        marked = []
+        cost = 0
+        with engine.begin() as connection:
+            for chunk in GiveawayHelper._chunks(list(game_ids)):
+                rows = connection.execute(select(TableGiveaway.giveaway_id, TableGiveaway.cost)
+                                          .where(TableGiveaway.giveaway_id.in_(chunk) & unmarked)).all()
+                if rows:
+                    chunk_marked = [row.giveaway_id for row in rows]
+                    connection.execute(update(TableGiveaway)
+                                       .where(TableGiveaway.giveaway_id.in_(chunk_marked))
+                                       .values({flag: True, 'updated_at': func.now()}))
+                    marked.extend(chunk_marked)
+                    cost += sum(row.cost for row in rows)
+            if flag == 'entered':
+                StatsHelper.add(connection, entered=len(marked), points_spent=cost)
+            else:
+                StatsHelper.add(connection, won=len(marked))
+        return marked
 
+    # the ids and end times of the entered giveaways that haven't ended yet
     @classmethod
-    def mark_game_as_won(cls, game_id):
+    def get_open_entered(cls):
         with Session(engine) as session:
-            result = session.query(TableGiveaway).filter_by(giveaway_id=game_id).all()
-            if result:
-                won_giveaway = result[0]
-                if not won_giveaway.won:
-                    won_giveaway.won = True
-                    session.add(won_giveaway)
-                    session.commit()
+            return session.query(TableGiveaway.giveaway_id, TableGiveaway.giveaway_ended_at) \
+                .filter(TableGiveaway.entered, TableGiveaway.giveaway_ended_at > datetime.utcnow()).all()
 
     @classmethod
     def insert(cls, giveaway, entered, won):
+        steam_id = GiveawayHelper.steam_id(giveaway)
         with Session(engine) as session:
-            result = session.query(TableSteamItem).filter_by(steam_id=giveaway.steam_app_id).all()
-            if result:
-                steam_id = result[0].steam_id
-            else:
+            result = SteamItemHelper.is_known(steam_id) or \
+                session.query(TableSteamItem).filter_by(steam_id=steam_id).all()
+            if not result:
                 item = TableSteamItem(
-                    steam_id=giveaway.steam_app_id,
+                    steam_id=steam_id,
                     steam_url=giveaway.steam_url,
                     game_name=giveaway.game_name)
                 session.add(item)
                 session.flush()
-                steam_id = item.steam_id
             g = TableGiveaway(
                 giveaway_id=giveaway.giveaway_game_id,
                 steam_id=steam_id,
@@ -175,7 +325,10 @@ class GiveawayHelper:
                 won=won,
                 game_entries=giveaway.game_entries)
             session.add(g)
+            StatsHelper.add(session, giveaways=1, entered=int(entered), won=int(won),
+                            points_spent=giveaway.cost if entered else 0)
             session.commit()
+        SteamItemHelper.remember((steam_id,))
 
     @classmethod
     def upsert_giveaway_with_details(cls, giveaway, entered, won):
@@ -185,6 +338,7 @@ class GiveawayHelper:
         else:
             with Session(engine) as session:
                 g = TableGiveaway(
+                    id=result[0].id,
                     giveaway_id=giveaway.giveaway_game_id,
                     steam_id=result[0].steam_id,
                     giveaway_uri=giveaway.giveaway_uri,
@@ -198,6 +352,7 @@ class GiveawayHelper:
                     won=won,
                     game_entries=giveaway.game_entries)
                 session.merge(g)
+                StatsHelper.add(session, **StatsHelper.changes(result[0], giveaway.cost, entered, won))
                 session.commit()
 
     @classmethod
@@ -208,6 +363,7 @@ class GiveawayHelper:
         else:
             with Session(engine) as session:
                 g = TableGiveaway(
+                    id=result[0].id,
                     giveaway_id=giveaway.giveaway_game_id,
                     steam_id=result[0].steam_id,
                     giveaway_uri=giveaway.giveaway_uri,
@@ -219,4 +375,174 @@ class GiveawayHelper:
                     contributor_level=giveaway.contributor_level,
                     game_entries=giveaway.game_entries)
                 session.merge(g)
+                StatsHelper.add(session, **StatsHelper.changes(result[0], giveaway.cost, result[0].entered,
+                                                               result[0].won))
                 session.commit()
+
+    @classmethod
+    def _giveaway_row(cls, giveaway):
+        return {
+            'giveaway_id': giveaway.giveaway_game_id,
+            'steam_id': GiveawayHelper.steam_id(giveaway),
+            'giveaway_uri': giveaway.giveaway_uri,
+            'user': giveaway.user,
+            'giveaway_created_at': GiveawayHelper.unix_timestamp_to_utc_datetime(giveaway.time_created_timestamp),
+            'giveaway_ended_at': GiveawayHelper.unix_timestamp_to_utc_datetime(giveaway.time_remaining_timestamp),
+            'cost': giveaway.cost,
+            'copies': giveaway.copies,
+            'contributor_level': giveaway.contributor_level,
+            'game_entries': giveaway.game_entries
+        }
+
+    # writes the steam items and giveaways of a whole page in a single transaction. `records` are
+    # (giveaway, entered, won) where entered and won of None leave the flags of an existing giveaway alone, the
+    # same as upsert_giveaway, and are False for a new one
+    @classmethod
+    def bulk_upsert(cls, records):
+        dialect_insert = DIALECT_INSERTS.get(engine.dialect.name)
+        if dialect_insert is None:
+            for giveaway, entered, won in records:
+                if entered is None:
+                    GiveawayHelper.upsert_giveaway(giveaway)
+                else:
+                    GiveawayHelper.upsert_giveaway_with_details(giveaway, entered, won)
+            return
+
+        steam_items = {}
+        # a giveaway can only be in a statement once, so the last record of it wins while keeping any flags set
+        # by an earlier one
+        flagged = {}
+        unflagged = {}
+        for giveaway, entered, won in records:
+            if giveaway.steam_app_id is None:
+                logger.debug(f"Not recording giveaway {giveaway.giveaway_game_id} without a steam app id")
+                continue
+            row = GiveawayHelper._giveaway_row(giveaway)
+            if not SteamItemHelper.is_known(row['steam_id']):
+                steam_items.setdefault(row['steam_id'], {'steam_id': row['steam_id'],
+                                                         'steam_url': giveaway.steam_url,
+                                                         'game_name': giveaway.game_name})
+            key = giveaway.giveaway_game_id
+            if entered is not None:
+                unflagged.pop(key, None)
+                flagged[key] = {**row, 'entered': entered, 'won': won}
+            elif key in flagged:
+                flagged[key] = {**row, 'entered': flagged[key]['entered'], 'won': flagged[key]['won']}
+            else:
+                unflagged[key] = {**row, 'entered': False, 'won': False}
+
+        with engine.begin() as connection:
+            existing = {}
+            for chunk in GiveawayHelper._chunks([*unflagged, *flagged]):
+                for row in connection.execute(select(TableGiveaway.giveaway_id, TableGiveaway.cost,
+                                                     TableGiveaway.entered, TableGiveaway.won)
+                                              .where(TableGiveaway.giveaway_id.in_(chunk))):
+                    existing[row.giveaway_id] = row
+            stats = dict.fromkeys(STATS_COLUMNS, 0)
+            for rows in (unflagged, flagged):
+                for key, row in rows.items():
+                    old = existing.get(key)
+                    if old is None:
+                        changes = StatsHelper.changes(None, row['cost'], row['entered'], row['won'])
+                    elif rows is unflagged:
+                        changes = StatsHelper.changes(old, row['cost'], old.entered, old.won)
+                    else:
+                        changes = StatsHelper.changes(old, row['cost'], row['entered'], row['won'])
+                    for column, change in changes.items():
+                        stats[column] += change
+            StatsHelper.add(connection, **stats)
+
+            for chunk in GiveawayHelper._chunks(list(steam_items.values())):
+                connection.execute(dialect_insert(TableSteamItem).values(chunk)
+                                   .on_conflict_do_nothing(index_elements=['steam_id']))
+            for rows, update_flags in ((list(unflagged.values()), False), (list(flagged.values()), True)):
+                for chunk in GiveawayHelper._chunks(rows):
+                    statement = dialect_insert(TableGiveaway).values(chunk)
+                    updated = [c for c in chunk[0] if c not in ('giveaway_id', 'steam_id')]
+                    if not update_flags:
+                        updated = [c for c in updated if c not in ('entered', 'won')]
+                    set_ = {c: statement.excluded[c] for c in updated}
+                    set_['updated_at'] = func.now()
+                    connection.execute(statement.on_conflict_do_update(index_elements=['giveaway_id'], set_=set_))
+        SteamItemHelper.remember(steam_items)
+
+    @classmethod
+    def _chunks(cls, rows):
+        return [rows[i:i + BULK_UPSERT_CHUNK_SIZE] for i in range(0, len(rows), BULK_UPSERT_CHUNK_SIZE)]
+
+
+class StatsHelper:
+
+    # totals of the giveaway table kept per day as giveaways are written, so the stats page reads a row per day
+    # instead of counting the whole giveaway table. `connection` is the session or connection doing the write
+    # so the totals are committed with it
+    @classmethod
+    def add(cls, connection, giveaways=0, entered=0, won=0, points_spent=0):
+        changes = {'giveaways': giveaways, 'entered': entered, 'won': won, 'points_spent': points_spent}
+        if not any(changes.values()):
+            return
+        day = datetime.utcnow().date()
+        stats = TableGiveawayStats.__table__
+        added = {stats.c[c]: stats.c[c] + change for c, change in changes.items()}
+        dialect_insert = DIALECT_INSERTS.get(engine.dialect.name)
+        if dialect_insert is not None:
+            # a single statement, so two writers starting the day at once can't both insert its row
+            connection.execute(dialect_insert(stats).values(day=day, **changes)
+                               .on_conflict_do_update(index_elements=[stats.c.day],
+                                                      set_={c.name: value for c, value in added.items()}))
+            return
+        result = connection.execute(update(stats).where(stats.c.day == day).values(added))
+        if result.rowcount == 0:
+            connection.execute(insert(stats).values(day=day, **changes))
+
+    # what writing a giveaway with these values changes in the totals. `old` is the row being replaced, if any
+    @classmethod
+    def changes(cls, old, cost, entered, won):
+        if old is None:
+            return {'giveaways': 1, 'entered': int(entered), 'won': int(won),
+                    'points_spent': cost if entered else 0}
+        return {'entered': int(entered) - int(old.entered),
+                'won': int(won) - int(old.won),
+                'points_spent': (cost if entered else 0) - (old.cost if old.entered else 0)}
+
+    @classmethod
+    def totals(cls):
+        with Session(engine) as session:
+            row = session.execute(select(*[func.coalesce(func.sum(getattr(TableGiveawayStats, c)), 0)
+                                           for c in STATS_COLUMNS])).one()
+            return dict(zip(STATS_COLUMNS, row))
+
+    @classmethod
+    def daily(cls, days=14):
+        with Session(engine) as session:
+            return session.query(TableGiveawayStats).order_by(TableGiveawayStats.day.desc()).limit(days).all()
+
+    # recounts the totals from the giveaway table. when a giveaway was entered or won isn't stored, so those
+    # are counted on the day it was first recorded
+    @classmethod
+    def rebuild(cls):
+        day = func.date(func.coalesce(TableGiveaway.created_at, TableGiveaway.giveaway_created_at))
+        totals = select(day,
+                        func.count(),
+                        func.sum(case((TableGiveaway.entered, 1), else_=0)),
+                        func.sum(case((TableGiveaway.won, 1), else_=0)),
+                        func.sum(case((TableGiveaway.entered, TableGiveaway.cost), else_=0))).group_by(day)
+        with engine.begin() as connection:
+            connection.execute(delete(TableGiveawayStats))
+            connection.execute(insert(TableGiveawayStats).from_select(['day', *STATS_COLUMNS], totals))
+
+
+class StateHelper:
+
+    # small values the bot needs to remember between runs, like how far it has read a list on steamgifts.com
+    @classmethod
+    def get(cls, key):
+        with Session(engine) as session:
+            state = session.get(TableBotState, key)
+            return state.value if state else None
+
+    @classmethod
+    def set(cls, key, value):
+        with Session(engine) as session:
+            session.merge(TableBotState(key=key, value=value))
+            session.commit()
@@ -0,0 +1,178 @@
+import threading
+from threading import Thread
+from time import monotonic
+
+from .database import GiveawayHelper, NotificationHelper
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class DatabaseWriter(Thread):
+
+    # writes the giveaways and notifications on its own thread so scraping and entering never wait on the
+    # database. pending giveaways are kept by giveaway code so one seen again before it was written only replaces
+    # the pending record, keeping any entered/won flags it had the same way bulk_upsert does. a batch is committed
+    # once batch_size giveaways are waiting or the oldest has waited flush_seconds. callers only block when
+    # max_pending giveaways are already waiting, which means the database is far behind
+    def __init__(self, max_pending=2000, batch_size=200, flush_seconds=2):
+        Thread.__init__(self, name="Database Writer", daemon=True)
+        self._max_pending = max(1, int(max_pending))
+        self._batch_size = max(1, int(batch_size))
+        self._flush_seconds = int(flush_seconds)
+        self._condition = threading.Condition()
+        self._giveaways = {}
+        self._notifications = []
+        self._oldest_at = None
+        self._writing_notifications = False
+        self._closed = False
+
+        self._commits = 0
+        self._written = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._max_depth = 0
+        self._commit_seconds = 0.0
+        self._slowest_commit = 0.0
+        self._blocked_seconds = 0.0
+
+    # takes the (giveaway, entered, won) records GiveawayHelper.bulk_upsert takes
+    def upsert_giveaways(self, records):
+        records = list(records)
+        with self._condition:
+            queued = 0
+            for giveaway, entered, won in records:
+                if self._closed:
+                    break
+                key = giveaway.giveaway_game_id
+                pending = self._giveaways.get(key)
+                if pending is None:
+                    self._wait_for_room()
+                    # waiting lets go of the lock, so the writer may have been closed and its thread gone since
+                    if self._closed:
+                        break
+                else:
+                    self._coalesced += 1
+                    if entered is None:
+                        entered, won = pending[1], pending[2]
+                self._giveaways[key] = (giveaway, entered, won)
+                queued += 1
+            if queued:
+                self._queued()
+            # once closed the rest are written straight away
+            if queued < len(records):
+                GiveawayHelper.bulk_upsert(records[queued:])
+
+    def insert_notification(self, type_of_error, message, medium, success, number_won):
+        with self._condition:
+            if self._closed:
+                NotificationHelper.insert(type_of_error, message, medium, success, number_won)
+                return
+            self._notifications.append((type_of_error, message, medium, success, number_won))
+            self._queued()
+
+    # blocks until the notifications queued so far are committed, for when they have to be read back. the queued
+    # giveaways go with them
+    def flush_notifications(self):
+        with self._condition:
+            if not self._notifications and not self._writing_notifications:
+                return
+            self._oldest_at = monotonic() - self._flush_seconds
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._closed or
+                                     not self._notifications and not self._writing_notifications)
+
+    # writes whatever is left and stops the thread. anything queued afterwards is written straight away
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self.is_alive():
+            self.join()
+        logger.info(f"💾 Database writer stopped. {self.summary()}")
+
+    def summary(self):
+        with self._condition:
+            depth = len(self._giveaways) + len(self._notifications)
+            average = self._commit_seconds / self._commits * 1000 if self._commits else 0
+            return f"{depth} queued (at most {self._max_depth}), {self._written} rows in {self._commits} commits " \
+                   f"(avg {average:.1f}ms, slowest {self._slowest_commit * 1000:.1f}ms), {self._coalesced} " \
+                   f"coalesced, {self._failed} failed, callers blocked {self._blocked_seconds:.1f}s"
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._batch_ready():
+                    self._condition.wait(self._wait_seconds())
+                if not self._has_pending():
+                    return
+                giveaways = self._take_giveaways()
+                notifications, self._notifications = self._notifications, []
+                # what is left over is older than flush_seconds too so it goes in the next batch straight away
+                if not self._has_pending():
+                    self._oldest_at = None
+                self._writing_notifications = bool(notifications)
+            try:
+                self._write(giveaways, notifications)
+            finally:
+                with self._condition:
+                    self._writing_notifications = False
+                    self._condition.notify_all()
+
+    def _write(self, giveaways, notifications):
+        started = monotonic()
+        try:
+            if giveaways:
+                GiveawayHelper.bulk_upsert(giveaways)
+            for notification in notifications:
+                NotificationHelper.insert(*notification)
+        except Exception as e:
+            # the giveaways are scraped again on the next run and entries are synced back from steamgifts.com so
+            # losing a batch only loses time. stopping the thread would lose every write after it
+            logger.error(f"❌ Failed writing {len(giveaways)} giveaways and {len(notifications)} notifications to "
+                         f"the database: {e}")
+            with self._condition:
+                self._failed += len(giveaways) + len(notifications)
+            return
+        elapsed = monotonic() - started
+        with self._condition:
+            self._commits += 1
+            self._written += len(giveaways) + len(notifications)
+            self._commit_seconds += elapsed
+            self._slowest_commit = max(self._slowest_commit, elapsed)
+        logger.debug(f"Wrote {len(giveaways)} giveaways and {len(notifications)} notifications in "
+                     f"{elapsed * 1000:.1f}ms")
+
+    # the methods below are called holding the condition's lock
+    def _has_pending(self):
+        return bool(self._giveaways or self._notifications)
+
+    def _batch_ready(self):
+        if self._closed or len(self._giveaways) >= min(self._batch_size, self._max_pending):
+            return True
+        return self._oldest_at is not None and monotonic() - self._oldest_at >= self._flush_seconds
+
+    def _wait_seconds(self):
+        if self._oldest_at is None:
+            return None
+        return max(0.0, self._flush_seconds - (monotonic() - self._oldest_at))
+
+    def _take_giveaways(self):
+        keys = list(self._giveaways)[:self._batch_size]
+        return [self._giveaways.pop(key) for key in keys]
+
+    def _wait_for_room(self):
+        if len(self._giveaways) < self._max_pending:
+            return
+        started = monotonic()
+        self._condition.notify_all()
+        self._condition.wait_for(lambda: self._closed or len(self._giveaways) < self._max_pending)
+        self._blocked_seconds += monotonic() - started
+
+    def _queued(self):
+        if self._oldest_at is None:
+            self._oldest_at = monotonic()
+        self._max_depth = max(self._max_depth, len(self._giveaways) + len(self._notifications))
+        self._condition.notify_all()
@@ -1,15 +1,17 @@
 import json
-from random import randint
-from time import sleep
-
-import requests
-from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+from collections import Counter
+from time import monotonic, time
+from urllib.parse import urlencode
 
+from .blacklist import Blacklist
 from .log import get_logger
 from .database import NotificationHelper, GiveawayHelper
-from .giveaway_entry import GiveawayEntry
+from .entered_giveaways import EnteredGiveaways
+from .entry_queue import DEADLINE_MARGIN_SECONDS
+from .giveaway_entry import GiveawayEntry, list_page_rows
+from .html_parser import HtmlParser
+from .page_prefetcher import PagePrefetcher
+from .seen_giveaways import SeenGiveaways
 
 logger = get_logger(__name__)
 
@@ -20,26 +22,37 @@ class SteamGiftsException(Exception):
 
 class EnterGiveaways:
 
-    def __init__(self, cookie, user_agent, gifts_type, pinned, min_points, max_entries,
-                 max_time_left, minimum_game_points, blacklist, notification):
-        self._contributor_level = None
-        self._xsrf_token = None
-        self._points = None
-        self._cookie = {
-            'PHPSESSID': cookie
-        }
-        self._user_agent = user_agent
+    def __init__(self, steamgifts_client, account_state, gifts_type, pinned, min_points, max_entries,
+                 max_time_left, minimum_game_points, blacklist, notification, html_parser=None,
+                 record_rejected_giveaways=False, scan_max_pages=2, scan_max_rows=0, scan_max_minutes=0,
+                 parser_pool=None, entered_giveaways=None, seen_giveaways=None, database_writer=None):
+        self._client = steamgifts_client
+        self._account = account_state
+        self._parser = html_parser or HtmlParser()
         self._gifts_type = gifts_type
         self._pinned = pinned
         self._min_points = int(min_points)
         self._max_entries = int(max_entries)
         self._max_time_left = int(max_time_left)
         self._minimum_game_points = int(minimum_game_points)
-        self._blacklist = blacklist.split(',')
+        self._blacklist = blacklist or Blacklist()
         self._notification = notification
+        self._record_rejected_giveaways = record_rejected_giveaways
+        # 0 means no limit for rows and minutes
+        self._scan_max_pages = int(scan_max_pages)
+        self._scan_max_rows = int(scan_max_rows)
+        self._scan_max_minutes = int(scan_max_minutes)
+        self._parser_pool = parser_pool
+        # shared with the other runners and the entered list sync so a giveaway is only ever POSTed once
+        self._entered = entered_giveaways if entered_giveaways is not None else EnteredGiveaways()
+        self._seen = seen_giveaways if seen_giveaways is not None else SeenGiveaways()
+        # with a writer the records are written on its thread and entering carries on straight away
+        self._writer = database_writer
+        self._row_counts = Counter()
+        # (giveaway, entered, won) waiting to be written to the database with the rest of their page
+        self._pending_records = []
 
-        self._base = "https://www.steamgifts.com"
-        self._session = requests.Session()
+        self._base = self._client.base_url
 
         self._filter_url = {
             'All': "search?page=%d",
@@ -50,58 +63,93 @@ class EnterGiveaways:
             'New': "search?page=%d&type=new"
         }
 
-    def start(self):
+    @property
+    def gifts_type(self):
+        return self._gifts_type
+
+    # used by the EntryPlanner. returns every giveaway we could enter without entering any
+    def collect_candidates(self):
         self._update_info()
-        if self._points >= self._min_points:
-            txt = f"〰 You have {self._points} points. Evaluating '{self._gifts_type}' giveaways..."
-            logger.info(txt)
-            self._evaluate_giveaways()
-        else:
-            txt = f"🟡 You have {self._points} points which is below your minimum point threshold of " \
-                  f"{self._min_points} points for '{self._gifts_type}' giveaways. Not evaluating right now."
-            logger.info(txt)
+        if not self._has_minimum_points():
+            return []
+        self._row_counts.clear()
+        try:
+            candidates = list(self._eligible_giveaways())
+        finally:
+            self.flush_records()
+        self._log_row_counts()
+        return candidates
+
+    # records the candidates the EntryPlanner decided not to enter
+    def record_passed_over(self, passed_over):
+        for giveaway in passed_over:
+            self._record(giveaway)
+        self.flush_records()
+
+    # enters a giveaway the EntryPlanner queued once its turn in the entry queue comes. returns True when entered.
+    # the EntryPlanner calls flush_records() once the queue is done
+    def enter_planned(self, giveaway):
+        if self._account.points < giveaway.cost:
+            logger.info(f"〰️ Not enough points left to enter queued giveaway: {giveaway.game_name}")
+            self._record(giveaway)
+            return False
+        return self._enter_and_record(giveaway)
+
+    # writes the records gathered so far in one go
+    def flush_records(self):
+        if self._pending_records:
+            if self._writer:
+                self._writer.upsert_giveaways(self._pending_records)
+            else:
+                GiveawayHelper.bulk_upsert(self._pending_records)
+            self._pending_records = []
 
-    def _requests_retry_session(
-            self,
-            retries=5,
-            backoff_factor=0.3
-    ):
-        session = self._session or requests.Session()
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=(500, 502, 504),
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        return session
+    def _record(self, giveaway, entered=None, won=None):
+        self._pending_records.append((giveaway, entered, won))
+
+    def _has_minimum_points(self):
+        if self._account.points >= self._min_points:
+            txt = f"〰 You have {self._account.points} points. Evaluating '{self._gifts_type}' giveaways..."
+            logger.info(txt)
+            return True
+        txt = f"🟡 You have {self._account.points} points which is below your minimum point threshold of " \
+              f"{self._min_points} points for '{self._gifts_type}' giveaways. Not evaluating right now."
+        logger.info(txt)
+        return False
 
     def _get_soup_from_page(self, url):
-        headers = {
-            'User-Agent': self._user_agent
-        }
-        self._requests_retry_session().get(url, headers=headers)
-        r = requests.get(url, cookies=self._cookie)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        fetched_at = monotonic()
+        r = self._client.get(url)
+        soup = self._parser.parse_giveaway_list(r.text)
+        if not self._account.update_from_soup(soup, fetched_at):
+            logger.error("⛔⛔⛔  Cookie is not valid. A new one must be added.⛔⛔⛔")
+            raise SteamGiftsException("Cookie is not valid. A new one must be added.")
         return soup
 
-    def _update_info(self):
-        soup = self._get_soup_from_page(self._base)
-
-        try:
-            self._xsrf_token = soup.find('input', {'name': 'xsrf_token'})['value']
-            self._points = int(soup.find('span', {'class': 'nav__points'}).text)  # storage points
-            self._contributor_level = int(float(soup.select_one('nav a>span[title]')['title']))
-        except TypeError:
+    # with a parser pool the page is parsed on another process and comes back as a ParsedPage of records
+    def _fetch_page(self, url):
+        if self._parser_pool is None:
+            return self._get_soup_from_page(url)
+        fetched_at = monotonic()
+        r = self._client.get(url)
+        page = self._parser_pool.parse(r.text, time())
+        if page.nav is None:
             logger.error("⛔⛔⛔  Cookie is not valid. A new one must be added.⛔⛔⛔")
             raise SteamGiftsException("Cookie is not valid. A new one must be added.")
+        self._account.update(*page.nav, fetched_at=fetched_at)
+        return page
+
+    def _update_info(self):
+        # the account state is refreshed from every page we fetch so only hit the homepage when it is stale
+        if self._account.is_stale():
+            logger.debug("Account state is stale. Refreshing from the homepage.")
+            self._get_soup_from_page(self._base)
 
-        won = soup.select("a[title='Giveaways Won'] div")
-        if won:
-            number_won = int(soup.select_one("a[title='Giveaways Won'] div").text)
+        number_won = self._account.number_won
+        if number_won:
+            # the won notification sent last time may still be waiting to be written
+            if self._writer:
+                self._writer.flush_notifications()
             won_notifications = NotificationHelper.get_won_notifications_today()
             if won_notifications and len(won_notifications) >= 1:
                 if number_won == won_notifications[-1].games_won:
@@ -120,21 +168,26 @@ class EnterGiveaways:
         else:
             logger.debug('No wins detected. Doing nothing.')
 
-    def _should_we_enter_giveaway(self, giveaway):
+    # the checks that only need the fields scraped up front, so most giveaways can be turned away
+    # before the rest of their row is scraped
+    def _passes_cheap_checks(self, giveaway):
         if giveaway.time_remaining_in_minutes is None:
             return False
-        if giveaway.time_created_in_minutes is None:
+        if giveaway.pinned and not self._pinned:
+            logger.info(f"〰️ Giveaway {giveaway.game_name} is pinned. Ignoring.")
+            return False
+        if not giveaway.cost:
+            logger.error(f"Cost could not be determined for '{giveaway.game_name}'")
             return False
 
-        if self._blacklist is not None and self._blacklist != ['']:
-            for keyword in self._blacklist:
-                if giveaway.game_name.lower().find(keyword.lower()) != -1:
-                    txt = f"〰️ Game {giveaway.game_name} contains the blacklisted keyword {keyword}"
-                    logger.info(txt)
-                    return False
-        if giveaway.contributor_level is None or self._contributor_level < giveaway.contributor_level:
+        blacklisted = self._blacklist.reason(giveaway)
+        if blacklisted:
+            txt = f"〰️ Game {giveaway.game_name} {blacklisted}"
+            logger.info(txt)
+            return False
+        if giveaway.contributor_level is None or self._account.contributor_level < giveaway.contributor_level:
             txt = f"〰️ Game {giveaway.game_name} requires at least level {giveaway.contributor_level} contributor " \
-                  f"level to enter. Your level: {self._contributor_level}"
+                  f"level to enter. Your level: {self._account.contributor_level}"
             logger.info(txt)
             return False
         if giveaway.time_remaining_in_minutes > self._max_time_left:
@@ -142,103 +195,217 @@ class EnterGiveaways:
                   f"above your cutoff of {self._max_time_left} minutes."
             logger.info(txt)
             return False
+        if giveaway.cost < self._minimum_game_points:
+            txt = f"〰️ Game {giveaway.game_name} costs {giveaway.cost}P and is below your cutoff of " \
+                  f"{self._minimum_game_points}P."
+            logger.info(txt)
+            return False
+
+        return True
+
+    def _should_we_enter_giveaway(self, giveaway):
+        if giveaway.time_created_in_minutes is None:
+            return False
         if giveaway.game_entries / giveaway.copies > self._max_entries:
             txt = f"〰️ Game {giveaway.game_name} has {giveaway.game_entries} entries and is above your cutoff " \
                   f"of {self._max_entries} entries."
             logger.info(txt)
             return False
-        if self._points - int(giveaway.cost) < 0:
+        if self._account.points - int(giveaway.cost) < 0:
             txt = f"〰️ Not enough points to enter: {giveaway.game_name}"
             logger.info(txt)
             return False
-        if giveaway.cost < self._minimum_game_points:
-            txt = f"〰️ Game {giveaway.game_name} costs {giveaway.cost}P and is below your cutoff of " \
-                  f"{self._minimum_game_points}P."
-            logger.info(txt)
-            return False
 
         return True
 
     def _enter_giveaway(self, giveaway):
-        headers = {
-            'User-Agent': self._user_agent
-        }
-        payload = {'xsrf_token': self._xsrf_token, 'do': 'entry_insert', 'code': giveaway.giveaway_game_id}
+        payload = {'xsrf_token': self._account.xsrf_token, 'do': 'entry_insert', 'code': giveaway.giveaway_game_id}
         logger.debug(f"Sending enter giveaway payload: {payload}")
-        entry = requests.post('https://www.steamgifts.com/ajax.php', data=payload, cookies=self._cookie,
-                              headers=headers)
+        entry = self._client.post(f"{self._base}/ajax.php", data=payload)
         json_data = json.loads(entry.text)
 
         if json_data['type'] == 'success':
             logger.debug(f"Successfully entered giveaway {giveaway.giveaway_game_id}: {json_data}")
+            # the response carries the account's remaining points so use it rather than estimating from the cost
+            if 'points' in json_data:
+                self._account.update_points(json_data['points'])
+            else:
+                self._account.update_points(self._account.points - int(giveaway.cost))
             return True
         else:
             logger.error(f"❌ Failed entering giveaway {giveaway.giveaway_game_id}: {json_data}")
             return False
 
-    def _evaluate_giveaways(self, page=1):
-        n = page
-        run = True
-        while run and n < 3:  # hard stop safety net at page 3 as idk why we would ever get to this point
-            txt = "〰️ Retrieving games from %d page." % n
-            logger.info(txt)
-
-            filtered_url = self._filter_url[self._gifts_type] % n
-            paginated_url = f"{self._base}/giveaways/{filtered_url}"
-
-            soup = self._get_soup_from_page(paginated_url)
+    # the filters the site can apply for us so fewer rows that would be thrown away are fetched. they are only
+    # ever looser than our own checks, which still run on every row. max_entries isn't sent as the site filters
+    # on total entries while we compare entries per copy. when the rejected giveaways are recorded the site
+    # mustn't leave them out, so nothing is filtered
+    def _search_params(self):
+        params = {}
+        if self._record_rejected_giveaways:
+            return params
+        if self._minimum_game_points > 0:
+            params['point_min'] = self._minimum_game_points
+        if self._account.points is not None:
+            params['point_max'] = self._account.points
+        if self._account.contributor_level is not None:
+            params['level_max'] = self._account.contributor_level
+        return params
 
-            pinned_giveaway_count = len(soup.select('div.pinned-giveaways__outer-wrap div.giveaway__row-inner-wrap'))
-            all_games_list_count = len(soup.select('div.giveaway__row-inner-wrap'))
-            # this matches on a div with the exact class value so we discard ones
-            # that also have a class 'is-faded' containing already entered giveaways
-            unentered_game_list = soup.select('div[class=giveaway__row-inner-wrap]')
-            # game_list = soup.find_all('div', {'class': 'giveaway__row-inner-wrap'})
+    # the same search_params have to be used for every page of a scan. they change as points are spent and each
+    # page is an offset into the results they filter, so pages built from different ones would skip giveaways
+    def _page_url(self, page, search_params):
+        filtered_url = self._filter_url[self._gifts_type] % page
+        if search_params:
+            filtered_url = f"{filtered_url}&{urlencode(search_params)}"
+        return f"{self._base}/giveaways/{filtered_url}"
 
-            if not len(unentered_game_list) or (all_games_list_count == pinned_giveaway_count):
-                txt = f"🟡 We have run out of gifts to consider."
-                logger.info(txt)
-                break
+    # the time remaining scraped from the page can be minutes old by the time a giveaway's turn comes, so it
+    # is worked out again right before the entry is sent
+    def _enter_and_record(self, giveaway):
+        if giveaway.refresh_time_remaining() <= DEADLINE_MARGIN_SECONDS:
+            self._row_counts['expired'] += 1
+            logger.info(f"⌛ Giveaway '{giveaway.game_name}' ended before we got to it. Skipping.")
+            self._record(giveaway)
+            return False
+        if giveaway.giveaway_game_id in self._entered:
+            self._row_counts['already entered'] += 1
+            logger.info(f"〰️ Giveaway '{giveaway.game_name}' was already entered. Skipping.")
+            self._record(giveaway, True, False)
+            return False
+        res = self._enter_giveaway(giveaway)
+        if res:
+            self._row_counts['entered'] += 1
+            self._entered.add(giveaway.giveaway_game_id, giveaway.time_remaining_timestamp)
+            self._record(giveaway, True, False)
+            txt = f"✅ Entered giveaway '{giveaway.game_name}'"
+            logger.info(txt)
+        else:
+            self._record(giveaway, False, False)
+        return res
 
-            for item in unentered_game_list:
-                giveaway = GiveawayEntry(item)
+    # lazily yields the giveaways we could enter right now and records the rest. the points are checked as each
+    # one is yielded so entering while iterating is seen by the following giveaways. giveaways seen before
+    # unchanged aren't written again, nor evaluated again when this feed already rejected them
+    def _eligible_giveaways(self, page=1):
+        for giveaway, passed_cheap_checks in self._giveaway_records(page):
+            if giveaway.has_details:
                 txt = f"〰 {giveaway.game_name} - {giveaway.cost}P - {giveaway.game_entries} entries " \
                       f"(w/ {giveaway.copies} copies) - Created {giveaway.time_created_string} ago " \
                       f"with {giveaway.time_remaining_string} remaining by {giveaway.user}."
                 logger.info(txt)
-                if giveaway.pinned and not self._pinned:
-                    logger.info(f"〰️ Giveaway {giveaway.game_name} is pinned. Ignoring.")
-                    continue
 
-                if self._points == 0 or self._points < self._min_points:
-                    txt = f"🟡 We have {self._points} points, but we need {self._min_points} to start."
+            rejected_by = self._seen.rejected_by(giveaway)
+            if rejected_by is not None:
+                self._row_counts['seen'] += 1
+            if passed_cheap_checks:
+                if rejected_by is not None and self._gifts_type in rejected_by:
+                    logger.debug(f"Giveaway {giveaway.giveaway_game_id} was already rejected and hasn't changed.")
+                elif self._should_we_enter_giveaway(giveaway):
+                    self._row_counts['eligible'] += 1
+                    yield giveaway
+                else:
+                    if rejected_by is None:
+                        self._record(giveaway)
+                    # turned away for its cost may not hold once points come back, so that one is evaluated again
+                    self._seen.remember(giveaway, self._gifts_type if self._account.points >= giveaway.cost else None)
+            elif giveaway.has_details and rejected_by is None:
+                self._record(giveaway)
+                self._seen.remember(giveaway)
+
+    def _log_row_counts(self):
+        counts = self._row_counts
+        logger.info(f"📊 '{self._gifts_type}' giveaways: fetched {counts['fetched']} rows over {counts['pages']} "
+                    f"page(s), {counts['unentered']} not yet entered, {counts['eligible']} eligible, "
+                    f"{counts['entered']} entered, {counts['already entered']} already entered, {counts['seen']} seen "
+                    f"before unchanged.")
+
+    # lazily yields (giveaway, passed cheap checks) across as many pages as the scan budget allows. only the
+    # page being evaluated (and the prefetched ones) are held in memory no matter how deep the scan goes
+    def _giveaway_records(self, page=1):
+        started = monotonic()
+        rows = 0
+        # with a parser pool keep as many pages in flight as there are processes to parse them
+        workers = self._parser_pool.workers if self._parser_pool else 1
+        search_params = self._search_params()
+        with PagePrefetcher(self._fetch_page, lambda n: self._page_url(n, search_params), lookahead=workers,
+                            workers=workers) as prefetcher:
+            for n, fetched in prefetcher.pages(page, page + self._scan_max_pages):
+                txt = "〰️ Evaluating games from %d page." % n
+                logger.info(txt)
+                self._row_counts['pages'] += 1
+                if self._parser_pool is None:
+                    candidates = self._parse_page(fetched)
+                else:
+                    candidates = self._check_parsed_page(fetched)
+                # everything recorded from the previous page goes to the database in one transaction
+                self.flush_records()
+                if not candidates:
+                    txt = f"🟡 We have run out of gifts to consider."
                     logger.info(txt)
-                    run = False
-                    break
-
-                if not giveaway.cost:
-                    logger.error(f"Cost could not be determined for '{giveaway.game_name}'")
-                    continue
-                if_enter_giveaway = self._should_we_enter_giveaway(giveaway)
-                if if_enter_giveaway:
-                    res = self._enter_giveaway(giveaway)
-                    if res:
-                        GiveawayHelper.upsert_giveaway_with_details(giveaway, True, False)
-                        self._points -= int(giveaway.cost)
-                        txt = f"✅ Entered giveaway '{giveaway.game_name}'"
+                    return
+
+                for giveaway, passed_cheap_checks in candidates:
+                    if self._scan_max_rows and rows >= self._scan_max_rows:
+                        logger.info(f"🟡 Scanned {rows} giveaways which is the most allowed per run.")
+                        return
+                    if self._scan_max_minutes and monotonic() - started > self._scan_max_minutes * 60:
+                        logger.info(f"🟡 Scanned for {self._scan_max_minutes} minutes which is the longest allowed "
+                                    f"per run.")
+                        return
+                    if passed_cheap_checks and \
+                            (self._account.points == 0 or self._account.points < self._min_points):
+                        txt = f"🟡 We have {self._account.points} points, but we need {self._min_points} to start."
                         logger.info(txt)
-                        sleep(randint(4, 15))
-                    else:
-                        GiveawayHelper.upsert_giveaway_with_details(giveaway, False, False)
-                else:
-                    GiveawayHelper.upsert_giveaway(giveaway)
-                # if we are on any filter type except New and we get to a giveaway that exceeds our
-                # max time left amount, then we don't need to continue to look at giveaways as any
-                # after this point will also exceed the max time left
-                if self._gifts_type != "New" and not giveaway.pinned and \
-                        giveaway.time_remaining_in_minutes > self._max_time_left:
-                    logger.info("🟡 We have run out of gifts to consider.")
-                    run = False
-                    break
-
-            n = n + 1
+                        return
+
+                    rows += 1
+                    yield giveaway, passed_cheap_checks
+
+                    # if we are on any filter type except New and we get to a giveaway that exceeds our
+                    # max time left amount, then we don't need to continue to look at giveaways as any
+                    # after this point will also exceed the max time left
+                    if self._gifts_type != "New" and not giveaway.pinned and \
+                            giveaway.time_remaining_in_minutes is not None and \
+                            giveaway.time_remaining_in_minutes > self._max_time_left:
+                        logger.info("🟡 We have run out of gifts to consider.")
+                        return
+
+    # turns the page's rows into records and releases the page. returns an empty list when there is
+    # nothing left worth considering on this or any later page
+    def _parse_page(self, soup):
+        all_games_list_count, pinned_giveaway_count, unentered_game_list = list_page_rows(soup)
+
+        self._row_counts['fetched'] += all_games_list_count
+        self._row_counts['unentered'] += len(unentered_game_list)
+
+        candidates = []
+        if len(unentered_game_list) and all_games_list_count != pinned_giveaway_count:
+            now = time()
+            for item in unentered_game_list:
+                giveaway = GiveawayEntry(item, now)
+                passed_cheap_checks = self._passes_cheap_checks(giveaway)
+                if passed_cheap_checks or self._record_rejected_giveaways:
+                    giveaway.load_details()
+                giveaway.detach()
+                candidates.append((giveaway, passed_cheap_checks))
+        # everything needed is in the records now so the tree doesn't need to live through the entries
+        del unentered_game_list
+        soup.release()
+        return candidates
+
+    # the same as _parse_page for a page a parser process already turned into fully scraped records. the worker
+    # can't run the cheap checks so the details of the rejected ones are dropped here, leaving them the same as
+    # _parse_page would have
+    def _check_parsed_page(self, parsed_page):
+        self._row_counts['fetched'] += parsed_page.all_count
+        self._row_counts['unentered'] += len(parsed_page.giveaways)
+
+        candidates = []
+        if len(parsed_page.giveaways) and parsed_page.all_count != parsed_page.pinned_count:
+            for giveaway in parsed_page.giveaways:
+                passed_cheap_checks = self._passes_cheap_checks(giveaway)
+                if not passed_cheap_checks and not self._record_rejected_giveaways:
+                    giveaway.drop_details()
+                candidates.append((giveaway, passed_cheap_checks))
+        return candidates
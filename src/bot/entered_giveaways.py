@@ -0,0 +1,48 @@
+import threading
+from datetime import timezone
+from time import time
+
+from .database import GiveawayHelper
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class EnteredGiveaways:
+
+    # the codes of the giveaways the account has entered that haven't ended yet, shared by every runner so an entry
+    # is never sent twice. loaded from the database at startup and topped up by every entry and entered list sync.
+    # codes are kept with their end time so ended ones can be dropped. ones synced from steamgifts.com that we
+    # have no record of don't have one and are kept until the bot restarts
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ends_at = {}
+
+    def load(self):
+        with self._lock:
+            for giveaway_id, ended_at in GiveawayHelper.get_open_entered():
+                self._ends_at[giveaway_id] = ended_at.replace(tzinfo=timezone.utc).timestamp()
+            count = len(self._ends_at)
+        logger.debug(f"Loaded {count} entered giveaways that haven't ended yet")
+
+    def add(self, giveaway_id, ends_at=None):
+        with self._lock:
+            if ends_at is not None or giveaway_id not in self._ends_at:
+                self._ends_at[giveaway_id] = ends_at
+
+    def __contains__(self, giveaway_id):
+        with self._lock:
+            return giveaway_id in self._ends_at
+
+    def prune(self):
+        now = time()
+        with self._lock:
+            ended = [g for g, ends_at in self._ends_at.items() if ends_at is not None and ends_at < now]
+            for giveaway_id in ended:
+                del self._ends_at[giveaway_id]
+            count = len(self._ends_at)
+        logger.debug(f"Dropped {len(ended)} ended giveaways from the entered giveaways. {count} left")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ends_at)
@@ -0,0 +1,91 @@
+from .entry_queue import EntryQueue
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class EntryPlanner:
+
+    # collects the eligible giveaways of every feed before entering any of them and enters them soonest-ending
+    # first across the feeds. with `plan_entries` only the set with the most expected wins that the account's
+    # points can pay for is entered, a wishlist giveaway's chance of winning multiplied by `wishlist_weight`.
+    # without it every one of them is queued and entered while the points last
+    def __init__(self, account_state, wishlist_weight=1, plan_entries=True):
+        self._account = account_state
+        self._wishlist_weight = int(wishlist_weight)
+        self._plan_entries = plan_entries
+
+    def run(self, feeds):
+        feeds = [feed for feed in feeds if feed]
+        candidates = []
+        seen = set()
+        for feed in feeds:
+            weight = self._wishlist_weight if feed.gifts_type == 'Wishlist' else 1
+            for giveaway in feed.collect_candidates():
+                # a wishlist giveaway also shows up on the 'All' page. it is only queued once
+                if giveaway.giveaway_game_id in seen:
+                    continue
+                seen.add(giveaway.giveaway_game_id)
+                candidates.append((feed, giveaway, weight * EntryPlanner.win_chance(giveaway)))
+
+        if self._plan_entries:
+            budget = self._account.points or 0
+            chosen = set(EntryPlanner.knapsack([(giveaway.cost, value) for _, giveaway, value in candidates],
+                                               budget))
+            cost = sum(candidates[i][1].cost for i in chosen)
+            expected_wins = sum(EntryPlanner.win_chance(candidates[i][1]) for i in chosen)
+            logger.info(f"🧮 Planned {len(chosen)} of {len(candidates)} eligible giveaways for {cost} of {budget}P. "
+                        f"Expected wins: {expected_wins:.4f}")
+        else:
+            # the ones the points don't stretch to are recorded when their turn comes
+            chosen = set(range(len(candidates)))
+
+        queue = EntryQueue()
+        for feed in feeds:
+            feed.record_passed_over([giveaway for i, (f, giveaway, _) in enumerate(candidates)
+                                     if f is feed and i not in chosen])
+        for i in chosen:
+            feed, giveaway, _ = candidates[i]
+            queue.push(giveaway, feed)
+
+        # soonest-ending first across every feed, so a giveaway about to end isn't left waiting behind
+        # ones that still have hours to go
+        entered = 0
+        try:
+            while queue:
+                giveaway, feed = queue.pop()
+                if feed.enter_planned(giveaway):
+                    entered += 1
+        finally:
+            for feed in feeds:
+                feed.flush_records()
+        logger.info(f"📊 Entered {entered} of {len(chosen)} queued giveaways.")
+
+    # our entry is one more on top of the current ones
+    @staticmethod
+    def win_chance(giveaway):
+        return giveaway.copies / (giveaway.game_entries + 1)
+
+    # 0/1 knapsack over (cost, value) pairs. returns the indexes of the items with the highest total value whose
+    # cost fits the budget. points are small integers so the table is at most a few hundred entries wide
+    @staticmethod
+    def knapsack(items, budget):
+        best = [0.0] * (budget + 1)
+        taken = []
+        for cost, value in items:
+            row = bytearray(budget + 1)
+            for points in range(budget, cost - 1, -1):
+                with_item = best[points - cost] + value
+                if with_item > best[points]:
+                    best[points] = with_item
+                    row[points] = 1
+            taken.append(row)
+
+        chosen = []
+        points = budget
+        for i in range(len(items) - 1, -1, -1):
+            if taken[i][points]:
+                chosen.append(i)
+                points -= items[i][0]
+        chosen.reverse()
+        return chosen
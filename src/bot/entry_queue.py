@@ -0,0 +1,29 @@
+import heapq
+from itertools import count
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# how close to its end a giveaway can get before it isn't worth sending the entry anymore
+DEADLINE_MARGIN_SECONDS = 10
+
+
+class EntryQueue:
+
+    # hands out the giveaways waiting to be entered soonest-ending first, whichever feed they came from.
+    # the order they were pushed in breaks ties so giveaways ending together keep their page order
+    def __init__(self):
+        self._heap = []
+        self._order = count()
+
+    def push(self, giveaway, feed):
+        heapq.heappush(self._heap, (giveaway.time_remaining_timestamp, next(self._order), giveaway, feed))
+
+    # returns (giveaway, feed) for the soonest-ending giveaway
+    def pop(self):
+        _, _, giveaway, feed = heapq.heappop(self._heap)
+        return giveaway, feed
+
+    def __len__(self):
+        return len(self._heap)
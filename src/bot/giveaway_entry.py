@@ -4,10 +4,47 @@ import time
 
 logger = get_logger(__name__)
 
+# the nodes needed to decide if a giveaway is worth a closer look, gathered with a single traversal of the row
+SUMMARY_SELECTOR = ', '.join([
+    'a.giveaway__heading__name',
+    'span.giveaway__heading__thin',
+    'a.giveaway__icon',
+    'div[title="Contributor Level"]',
+    'a.giveaway__username',
+    'span[data-timestamp]'
+])
+# the rest of the row, only gathered for giveaways that made it past the cheap checks
+DETAILS_SELECTOR = ', '.join([
+    'div.giveaway__links span',
+    'span[data-timestamp]'
+])
+CONTRIBUTOR_LEVEL_PATTERN = re.compile('^Level (?P<level>[0-9]+)\\+$', re.IGNORECASE)
+STEAM_APP_ID_PATTERN = re.compile('^.+/[a-z0-9]+/(?P<steam_app_id>[0-9]+)/$', re.IGNORECASE)
+NUMBER_PATTERN = re.compile('^[0-9]+$')
+COPIES_PATTERN = re.compile('(?P<copies>[0-9]+) Copies', re.IGNORECASE)
+
+
+# the number of rows on a giveaway list page, how many of them are pinned and the rows that haven't been entered yet
+def list_page_rows(soup):
+    pinned_count = len(soup.select('div.pinned-giveaways__outer-wrap div.giveaway__row-inner-wrap'))
+    all_count = len(soup.select('div.giveaway__row-inner-wrap'))
+    # this matches on a div with the exact class value so we discard ones
+    # that also have a class 'is-faded' containing already entered giveaways
+    unentered = soup.select('div[class=giveaway__row-inner-wrap]')
+    return all_count, pinned_count, unentered
+
 
 class GiveawayEntry:
 
-    def __init__(self, soup_item):
+    __slots__ = ('steam_app_id', 'steam_url', 'game_name', 'giveaway_game_id', 'giveaway_uri', 'pinned', 'cost',
+                 'game_entries', 'user', 'copies', 'contributor_level', 'time_created_timestamp',
+                 'time_remaining_string', 'time_remaining_in_minutes', 'time_remaining_timestamp',
+                 'time_created_string', 'time_created_in_minutes', 'has_details', '_soup_item', '_now')
+
+    # only the fields needed by the cheap checks (code, name, steam app, user, cost, copies, level, pinned and
+    # time remaining) are scraped up front. load_details() scrapes the rest while the page's tree is still around.
+    # `now` is the unix time the page was scraped at so it only has to be looked up once per page
+    def __init__(self, soup_item, now=None):
         self.steam_app_id = None
         self.steam_url = None
         self.game_name = None
@@ -25,80 +62,133 @@ class GiveawayEntry:
         self.time_remaining_timestamp = None
         self.time_created_string = None
         self.time_created_in_minutes = None
+        self.has_details = False
+        self._soup_item = soup_item
+        self._now = time.time() if now is None else now
+
+        heading = None
+        item_headers = []
+        contributor_level = None
+        times = []
+        for node in soup_item.select(SUMMARY_SELECTOR):
+            tag = node.tag
+            if tag == 'span':
+                if node.get('data-timestamp') is not None:
+                    times.append(node)
+                else:
+                    item_headers.append(node)
+            elif tag == 'a':
+                classes = node.classes
+                if 'giveaway__heading__name' in classes:
+                    heading = node
+                elif 'giveaway__icon' in classes:
+                    if self.steam_url is None:
+                        self.steam_url = node['href']
+                elif 'giveaway__username' in classes:
+                    self.user = node.text
+            else:
+                contributor_level = node
 
-        logger.debug(f"Giveaway html: {soup_item}")
-        icons = soup_item.select('a.giveaway__icon')
-        self.steam_url = icons[0]['href']
         self.steam_app_id = self._get_steam_app_id(self.steam_url)
-        self.game_name = soup_item.find('a', {'class': 'giveaway__heading__name'}).text
-        self.giveaway_game_id = soup_item.find('a', {'class': 'giveaway__heading__name'})['href'].split('/')[2]
-        self.giveaway_uri = soup_item.select_one('a.giveaway__heading__name')['href']
-        pin_class = soup_item.parent.parent.get("class")
-        self.pinned = pin_class is not None and len(pin_class) > 0 and pin_class[0].find('pinned') != -1
-        self.cost, self.copies = self._determine_cost_and_copies(soup_item, self.game_name, self.giveaway_game_id)
-        self.game_entries = int(soup_item.select('div.giveaway__links span')[0].text.split(' ')[0].replace(',', ''))
-        contributor_level = soup_item.select_one('div[title="Contributor Level"]')
+        self.game_name = heading.text
+        self.giveaway_uri = heading['href']
+        self.giveaway_game_id = self.giveaway_uri.split('/')[2]
+        # the row's grandparent is missing when only the rows of a page were parsed
+        row_container = soup_item.parent.parent
+        pin_class = row_container.classes if row_container is not None else []
+        self.pinned = len(pin_class) > 0 and pin_class[0].find('pinned') != -1
+        self.cost, self.copies = self._determine_cost_and_copies(item_headers, self.game_name, self.giveaway_game_id)
         self.contributor_level = self._determine_contributor_level(contributor_level)
-        self.user = soup_item.select_one('a.giveaway__username').text
-        times = soup_item.select('div span[data-timestamp]')
         self.time_remaining_timestamp = int(times[0]['data-timestamp'])
         self.time_remaining_string = times[0].text
-        self.time_remaining_in_minutes = self._determine_time_in_minutes(times[0]['data-timestamp'])
+        self.time_remaining_in_minutes = self._determine_time_in_minutes(times[0]['data-timestamp'], self._now)
+
+    def load_details(self):
+        if self.has_details:
+            return
+        soup_item = self._soup_item
+        logger.debug(f"Giveaway html: {soup_item}")
+        entries = None
+        times = []
+        for node in soup_item.select(DETAILS_SELECTOR):
+            if node.get('data-timestamp') is not None:
+                times.append(node)
+            elif entries is None:
+                entries = node
+
+        self.game_entries = int(entries.text.split(' ')[0].replace(',', ''))
         self.time_created_timestamp = int(times[1]['data-timestamp'])
         self.time_created_string = times[1].text
-        self.time_created_in_minutes = self._determine_time_in_minutes(times[1]['data-timestamp'])
+        self.time_created_in_minutes = self._determine_time_in_minutes(times[1]['data-timestamp'], self._now)
+        self.has_details = True
         logger.debug(f"Scraped Giveaway: {self}")
 
+    # works the time remaining out again from the end timestamp. returns the seconds left, which are 0 or
+    # less once the giveaway has ended
+    def refresh_time_remaining(self, now=None):
+        now = time.time() if now is None else now
+        self.time_remaining_in_minutes = self._determine_time_in_minutes(str(self.time_remaining_timestamp), now)
+        return self.time_remaining_timestamp - now
+
+    # drops the reference to the page's tree so it can be released once the page has been evaluated
+    def detach(self):
+        self._soup_item = None
+
+    # forgets what load_details() scraped, for a giveaway that was scraped in full before it was checked
+    def drop_details(self):
+        self.game_entries = None
+        self.time_created_timestamp = None
+        self.time_created_string = None
+        self.time_created_in_minutes = None
+        self.has_details = False
+
     def _determine_contributor_level(self, contributor_level):
         if contributor_level is None:
             return 0
-        match = re.search('^Level (?P<level>[0-9]+)\\+$', contributor_level.text, re.IGNORECASE)
+        match = CONTRIBUTOR_LEVEL_PATTERN.search(contributor_level.text)
         if match:
             return int(match.group('level'))
         else:
             return None
 
     def _get_steam_app_id(self, steam_url):
-        match = re.search('^.+/[a-z0-9]+/(?P<steam_app_id>[0-9]+)/$', steam_url, re.IGNORECASE)
+        match = STEAM_APP_ID_PATTERN.search(steam_url)
         if match:
             return match.group('steam_app_id')
         else:
             return None
 
-    def _determine_time_in_minutes(self, timestamp):
-        if not timestamp or not re.search('^[0-9]+$', timestamp):
+    def _determine_time_in_minutes(self, timestamp, now):
+        if not timestamp or not NUMBER_PATTERN.search(timestamp):
             logger.error(f"Could not determine time from string {timestamp}")
             return None
-        now = time.localtime()
-        giveaway_endtime = time.localtime(int(timestamp))
-        return int(abs((time.mktime(giveaway_endtime) - time.mktime(now)) / 60))
+        return int(abs((int(timestamp) - int(now)) / 60))
 
-    def _determine_cost_and_copies(self, item, game_name, game_id):
-        item_headers = item.find_all('span', {'class': 'giveaway__heading__thin'})
+    def _determine_cost_and_copies(self, item_headers, game_name, game_id):
         if len(item_headers) == 1:  # then no multiple copies
-            game_cost = item_headers[0].getText().replace('(', '').replace(')', '').replace('P', '')
-            if not re.search('^[0-9]+$', game_cost):
+            game_cost = item_headers[0].text.replace('(', '').replace(')', '').replace('P', '')
+            if not NUMBER_PATTERN.search(game_cost):
                 txt = f"Unable to determine cost of {game_name} with id {game_id}. Cost string: {item_headers[0]}"
                 logger.error(txt)
                 return None, None
             game_cost = int(game_cost)
             return game_cost, 1
         elif len(item_headers) == 2:  # then multiple copies
-            game_cost = item_headers[1].getText().replace('(', '').replace(')', '').replace('P', '')
-            if not re.search('^[0-9]+$', game_cost):
-                txt = f"Unable to determine cost of {game_name} with id {game_id}. Cost string: {item_headers[1].getText()}"
+            game_cost = item_headers[1].text.replace('(', '').replace(')', '').replace('P', '')
+            if not NUMBER_PATTERN.search(game_cost):
+                txt = f"Unable to determine cost of {game_name} with id {game_id}. Cost string: {item_headers[1].text}"
                 logger.error(txt)
                 return None, None
             game_cost = int(game_cost)
 
-            match = re.search('(?P<copies>[0-9]+) Copies', item_headers[0].getText(), re.IGNORECASE)
+            match = COPIES_PATTERN.search(item_headers[0].text)
             if match:
                 num_copies_str = match.group('copies')
                 num_copies = int(num_copies_str)
                 return game_cost, num_copies
             else:
                 txt = f"It appears there are multiple copies of {game_name} with id {game_id}, but we could not " \
-                      f"determine that. Copy string: {item_headers[0].getText()}"
+                      f"determine that. Copy string: {item_headers[0].text}"
                 logger.error(txt)
                 return game_cost, 1
         else:
@@ -107,4 +197,4 @@ class GiveawayEntry:
             return None, None
 
     def __str__(self):
-        return str(self.__class__) + ": " + str(self.__dict__)
+        return str(self.__class__) + ": " + str({k: getattr(self, k) for k in self.__slots__ if k[0] != '_'})
@@ -4,17 +4,27 @@ from datetime import timedelta, datetime
 from threading import Thread
 from time import sleep
 
+from .account_state import AccountState
+from .blacklist import Blacklist
 from .enter_giveaways import EnterGiveaways
+from .entered_giveaways import EnteredGiveaways
+from .entry_planner import EntryPlanner
 from .evaluate_won_giveaways import EvaluateWonGiveaways
+from .html_parser import HtmlParser
+from .page_parser_pool import PageParserPool
+from .rate_limiter import RateLimiter
 from .log import get_logger
 from .scheduler import Scheduler
+from .seen_giveaways import SeenGiveaways
+from .steamgifts_client import SteamGiftsClient
+from .sync_entered_giveaways import SyncEnteredGiveaways
 
 logger = get_logger(__name__)
 
 
 class GiveawayThread(threading.Thread):
 
-    def __init__(self, config, notification):
+    def __init__(self, config, notification, database_writer=None):
         Thread.__init__(self)
         self.exc = None
         self.config = config
@@ -23,41 +33,76 @@ class GiveawayThread(threading.Thread):
         self._scheduler = Scheduler()
         self.won_giveaway_job_id = 'eval_won_giveaways'
         self.evaluate_giveaway_job_id = 'eval_giveaways'
+        self._all_page = None
+        self._wishlist_page = None
+
+        cookie = config['DEFAULT'].get('cookie')
+        user_agent = config['DEFAULT'].get('user_agent')
+        # one client (and therefore one connection pool and rate limiter) is shared by every runner for this account
+        rate_limiter = RateLimiter(config['DEFAULT'].getint('requests_per_minute'),
+                                   config['DEFAULT'].getint('request_burst'),
+                                   config['DEFAULT'].getint('request_jitter_seconds'))
+        self._steamgifts_client = SteamGiftsClient(cookie, user_agent, rate_limiter=rate_limiter)
+        self._account_state = AccountState()
+        self._html_parser = HtmlParser(config['DEFAULT'].get('html_parser'))
+        record_rejected_giveaways = config['DEFAULT'].getboolean('record_rejected_giveaways')
+        scan_max_pages = config['DEFAULT'].getint('scan_max_pages')
+        scan_max_rows = config['DEFAULT'].getint('scan_max_rows')
+        scan_max_minutes = config['DEFAULT'].getint('scan_max_minutes')
+        parse_workers = config['DEFAULT'].getint('parse_workers')
+        self._parser_pool = PageParserPool(self._html_parser.backend, parse_workers) if parse_workers else None
+        self._entry_planner = EntryPlanner(self._account_state, config['WISHLIST'].getint('wishlist.weight'),
+                                           config['DEFAULT'].getboolean('plan_entries'))
+        self._entered_giveaways = EnteredGiveaways()
+        self._entered_giveaways.load()
+        self._seen_giveaways = SeenGiveaways(config['DEFAULT'].getint('seen_cache_size'),
+                                             config['DEFAULT'].getint('seen_cache_minutes'))
 
         if config['DEFAULT'].getboolean('enabled'):
-            cookie = config['DEFAULT'].get('cookie')
-            user_agent = config['DEFAULT'].get('user_agent')
-
             minimum_points = config['DEFAULT'].getint('minimum_points')
             max_entries = config['DEFAULT'].getint('max_entries')
             max_time_left = config['DEFAULT'].getint('max_time_left')
             minimum_game_points = config['DEFAULT'].getint('minimum_game_points')
-            blacklist = config['DEFAULT'].get('blacklist_keywords')
-
-            self._all_page = EnterGiveaways(cookie, user_agent, 'All', False, minimum_points, max_entries,
-                                            max_time_left, minimum_game_points, blacklist, notification)
+            blacklist = Blacklist(config['DEFAULT'].get('blacklist_keywords'),
+                                  config['DEFAULT'].get('blacklist_whole_words'),
+                                  config['DEFAULT'].get('blacklist_steam_app_ids'),
+                                  config['DEFAULT'].get('blacklist_users'))
+
+            self._all_page = EnterGiveaways(self._steamgifts_client, self._account_state, 'All', False,
+                                            minimum_points, max_entries, max_time_left, minimum_game_points,
+                                            blacklist, notification, self._html_parser,
+                                            record_rejected_giveaways, scan_max_pages, scan_max_rows,
+                                            scan_max_minutes, self._parser_pool, self._entered_giveaways,
+                                            self._seen_giveaways, database_writer)
 
         if config['WISHLIST'].getboolean('wishlist.enabled'):
             wishlist_minimum_points = config['WISHLIST'].getint('wishlist.minimum_points')
             wishlist_max_entries = config['WISHLIST'].getint('wishlist.max_entries')
             wishlist_max_time_left = config['WISHLIST'].getint('wishlist.max_time_left')
 
-            self._wishlist_page = EnterGiveaways(cookie, user_agent, 'Wishlist', False, wishlist_minimum_points,
-                                                 wishlist_max_entries, wishlist_max_time_left, 0, '', notification)
+            self._wishlist_page = EnterGiveaways(self._steamgifts_client, self._account_state, 'Wishlist',
+                                                 False, wishlist_minimum_points, wishlist_max_entries,
+                                                 wishlist_max_time_left, 0, None, notification, self._html_parser,
+                                                 record_rejected_giveaways, scan_max_pages, scan_max_rows,
+                                                 scan_max_minutes, self._parser_pool, self._entered_giveaways,
+                                                 self._seen_giveaways, database_writer)
 
         if not self._all_page and not self._wishlist_page:
             logger.error("⁉️ Both 'Default' and 'Wishlist' configurations are disabled. Nothing will run. Exiting...")
             sleep(10)
             exit(-1)
 
+        self._scheduler.remove_stored_jobs(self.won_giveaway_job_id, self.evaluate_giveaway_job_id)
         won_giveaway_job = self._scheduler.get_job(job_id=self.won_giveaway_job_id)
         if won_giveaway_job:
             logger.debug("Previous won giveaway evaluator job exists. Removing.")
             won_giveaway_job.remove()
-        won_runner = GiveawayThread.WonRunner(EvaluateWonGiveaways(cookie, user_agent, notification),
+        won_runner = GiveawayThread.WonRunner(EvaluateWonGiveaways(self._steamgifts_client, self._account_state,
+                                                                   notification, self._html_parser),
                                               self.won_giveaway_job_id)
         self._scheduler.add_job(won_runner.run,
                                 id=self.won_giveaway_job_id,
+                                jobstore='memory',
                                 trigger='interval',
                                 max_instances=1,
                                 replace_existing=True,
@@ -69,10 +114,14 @@ class GiveawayThread(threading.Thread):
         if evaluate_giveaway_job:
             logger.debug("Previous giveaway evaluator job exists. Removing.")
             evaluate_giveaway_job.remove()
-        runner = GiveawayThread.GiveawayRunner(self._wishlist_page, self._all_page,
-                                               self.evaluate_giveaway_job_id)
+        entered_sync = SyncEnteredGiveaways(self._steamgifts_client, self._account_state, self._entered_giveaways,
+                                            self._html_parser)
+        runner = GiveawayThread.GiveawayRunner(self._wishlist_page, self._all_page, self._steamgifts_client,
+                                               self.evaluate_giveaway_job_id, self._entry_planner, entered_sync,
+                                               self._seen_giveaways, database_writer)
         self._scheduler.add_job(runner.run,
                                 id=self.evaluate_giveaway_job_id,
+                                jobstore='memory',
                                 trigger='interval',
                                 max_instances=1,
                                 replace_existing=True,
@@ -87,6 +136,14 @@ class GiveawayThread(threading.Thread):
             self._scheduler.start()
         except BaseException as e:
             self.exc = e
+        finally:
+            if self._parser_pool:
+                self._parser_pool.shutdown()
+
+    # stops scheduling runs so the thread can finish. a run already going is left to finish on its own
+    def stop(self):
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
 
     def join(self):
         threading.Thread.join(self)
@@ -116,18 +173,28 @@ class GiveawayThread(threading.Thread):
 
     class GiveawayRunner:
 
-        def __init__(self, wishlist_page, all_page, job_id):
+        def __init__(self, wishlist_page, all_page, steamgifts_client, job_id, entry_planner, entered_sync=None,
+                     seen_giveaways=None, database_writer=None):
             self._wishlist_page = wishlist_page
             self._all_page = all_page
+            self._steamgifts_client = steamgifts_client
             self._job_id = job_id
+            self._entry_planner = entry_planner
+            self._entered_sync = entered_sync
+            self._seen_giveaways = seen_giveaways
+            self._database_writer = database_writer
 
         def run(self):
             logger.info("🟢 Evaluating giveaways.")
-            if self._wishlist_page:
-                self._wishlist_page.start()
-            if self._all_page:
-                self._all_page.start()
+            if self._entered_sync:
+                self._entered_sync.start()
+            self._entry_planner.run([self._wishlist_page, self._all_page])
             logger.info("🔴 All giveaways evaluated.")
+            logger.info(f"📶 SteamGifts requests so far: {self._steamgifts_client.timing_summary()}")
+            if self._seen_giveaways:
+                logger.info(f"🗃️ Seen giveaways so far: {self._seen_giveaways.summary()}")
+            if self._database_writer:
+                logger.info(f"💾 Database writes so far: {self._database_writer.summary()}")
             scheduler = Scheduler()
             evaluate_giveaway_job = scheduler.get_job(job_id=self._job_id)
             if evaluate_giveaway_job:
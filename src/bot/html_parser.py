@@ -0,0 +1,158 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'lexbor')
+
+
+def _is_giveaway_list_region(name, attrs):
+    # the only parts of a giveaway list page the bot reads. pinned rows keep their wrapper so they can
+    # still be recognised as pinned, the nav bar and xsrf token feed the account state
+    if name == 'div':
+        classes = attrs.get('class') or ''
+        if not isinstance(classes, str):
+            classes = ' '.join(classes)
+        classes = classes.split()
+        return 'giveaway__row-outer-wrap' in classes or 'pinned-giveaways__outer-wrap' in classes
+    if name == 'input':
+        return attrs.get('name') == 'xsrf_token'
+    return name == 'nav'
+
+
+GIVEAWAY_LIST_STRAINER = SoupStrainer(_is_giveaway_list_region)
+
+
+class SoupNode:
+    # wraps a BeautifulSoup Tag so the scrapers don't depend on which parser built the tree
+
+    __slots__ = ('_tag',)
+
+    def __init__(self, tag):
+        self._tag = tag
+
+    def select(self, selector):
+        return [SoupNode(t) for t in self._tag.select(selector)]
+
+    def select_one(self, selector):
+        tag = self._tag.select_one(selector)
+        return SoupNode(tag) if tag is not None else None
+
+    def get(self, attribute, default=None):
+        return self._tag.get(attribute, default)
+
+    def __getitem__(self, attribute):
+        return self._tag[attribute]
+
+    @property
+    def tag(self):
+        return self._tag.name
+
+    @property
+    def classes(self):
+        return self._tag.get('class') or []
+
+    @property
+    def text(self):
+        return self._tag.get_text()
+
+    @property
+    def parent(self):
+        parent = self._tag.parent
+        return SoupNode(parent) if parent is not None else None
+
+    # BeautifulSoup trees are full of reference cycles so tear them down explicitly instead of waiting on the gc
+    def release(self):
+        self._tag.decompose()
+
+    def __str__(self):
+        return str(self._tag)
+
+
+class LexborNode:
+    # wraps a selectolax lexbor node with the same interface as SoupNode
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, selector):
+        return [LexborNode(n) for n in self._node.css(selector)]
+
+    def select_one(self, selector):
+        node = self._node.css_first(selector)
+        return LexborNode(node) if node is not None else None
+
+    def get(self, attribute, default=None):
+        value = self._node.attributes.get(attribute, default)
+        return default if value is None else value
+
+    def __getitem__(self, attribute):
+        value = self._node.attributes[attribute]
+        if value is None:
+            raise KeyError(attribute)
+        return value
+
+    @property
+    def tag(self):
+        return self._node.tag
+
+    @property
+    def classes(self):
+        return (self._node.attributes.get('class') or '').split()
+
+    @property
+    def text(self):
+        return self._node.text(deep=True)
+
+    @property
+    def parent(self):
+        parent = self._node.parent
+        return LexborNode(parent) if parent is not None else None
+
+    # the lexbor tree lives in C memory that is freed as soon as the parser is no longer referenced
+    def release(self):
+        self._node = None
+
+    def __str__(self):
+        return self._node.html or ''
+
+
+class HtmlParser:
+
+    def __init__(self, backend='html.parser'):
+        self.backend = self._available_backend(backend)
+        if self.backend != backend:
+            logger.warning(f"HTML parser '{backend}' is not installed. Falling back to '{self.backend}'.")
+        logger.debug(f"Using HTML parser '{self.backend}'")
+
+    def parse(self, markup):
+        if self.backend == 'lexbor':
+            from selectolax.lexbor import LexborHTMLParser
+            return LexborNode(LexborHTMLParser(markup).root)
+        return SoupNode(BeautifulSoup(markup, self.backend))
+
+    # builds a tree of only the giveaway rows, the nav bar and the xsrf token of a giveaway list page.
+    # lexbor always builds the whole tree but does so in C, so it is just a normal parse there
+    def parse_giveaway_list(self, markup):
+        if self.backend == 'lexbor':
+            return self.parse(markup)
+        return SoupNode(BeautifulSoup(markup, self.backend, parse_only=GIVEAWAY_LIST_STRAINER))
+
+    @staticmethod
+    def _available_backend(backend):
+        if backend == 'lexbor':
+            try:
+                import selectolax.lexbor  # noqa: F401
+                return backend
+            except ImportError:
+                backend = 'lxml'
+        if backend == 'lxml':
+            try:
+                import lxml  # noqa: F401
+                return backend
+            except ImportError:
+                pass
+        return 'html.parser'
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Column, DateTime, Boolean, func, ForeignKey
+from sqlalchemy import Integer, String, Column, Date, DateTime, Boolean, func, ForeignKey, Index
 from sqlalchemy.orm import registry, relationship
 
 mapper_registry = registry()
@@ -17,6 +17,8 @@ class TableNotification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index('ix_notification_type_created_at', 'type', 'created_at'),
+                      Index('ix_notification_created_at_id', 'created_at', 'id'))
     __mapper_args__ = {"eager_defaults": True}
 
     def __str__(self):
@@ -25,7 +27,7 @@ class TableNotification(Base):
 
 class TableSteamItem(Base):
     __tablename__ = 'steam_item'
-    steam_id = Column(String(15), primary_key=True, nullable=False)
+    steam_id = Column(Integer, primary_key=True, autoincrement=False, nullable=False)
     game_name = Column(String(200), nullable=False)
     steam_url = Column(String(100), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -39,8 +41,9 @@ class TableSteamItem(Base):
 
 class TableGiveaway(Base):
     __tablename__ = 'giveaway'
-    giveaway_id = Column(String(10), primary_key=True, nullable=False)
-    steam_id = Column(Integer, ForeignKey('steam_item.steam_id'), primary_key=True)
+    id = Column(Integer, primary_key=True, nullable=False)
+    giveaway_id = Column(String(10), nullable=False, index=True, unique=True)
+    steam_id = Column(Integer, ForeignKey('steam_item.steam_id'), nullable=False)
     giveaway_uri = Column(String(200), nullable=False)
     user = Column(String(40), nullable=False)
     giveaway_created_at = Column(DateTime(timezone=True), nullable=False)
@@ -48,15 +51,38 @@ class TableGiveaway(Base):
     cost = Column(Integer(), nullable=False)
     copies = Column(Integer(), nullable=False)
     contributor_level = Column(Integer(), nullable=False)
-    entered = Column(Boolean(), nullable=False)
-    won = Column(Boolean(), nullable=False)
+    entered = Column(Boolean(), nullable=False, index=True)
+    won = Column(Boolean(), nullable=False, index=True)
     game_entries = Column(Integer(), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     steam_item = relationship("TableSteamItem", back_populates="giveaways")
 
+    __table_args__ = (Index('ix_giveaway_giveaway_ended_at_id', 'giveaway_ended_at', 'id'),)
     __mapper_args__ = {"eager_defaults": True}
 
     def __str__(self):
         return str(self.__class__) + ": " + str(self.__dict__)
+
+
+class TableGiveawayStats(Base):
+    __tablename__ = 'giveaway_stats'
+    day = Column(Date, primary_key=True, nullable=False)
+    giveaways = Column(Integer(), nullable=False, default=0)
+    entered = Column(Integer(), nullable=False, default=0)
+    won = Column(Integer(), nullable=False, default=0)
+    points_spent = Column(Integer(), nullable=False, default=0)
+
+    def __str__(self):
+        return str(self.__class__) + ": " + str(self.__dict__)
+
+
+class TableBotState(Base):
+    __tablename__ = 'bot_state'
+    key = Column(String(50), primary_key=True, nullable=False)
+    value = Column(String(200), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __str__(self):
+        return str(self.__class__) + ": " + str(self.__dict__)
@@ -9,11 +9,12 @@ logger = get_logger(__name__)
 
 class Notification:
 
-    def __init__(self, message_prefix):
+    def __init__(self, message_prefix, database_writer=None):
         self.pushover = False
         self.pushover_token = None
         self.pushover_user_key = None
         self.message_prefix = f"{message_prefix}: "
+        self.database_writer = database_writer
 
     def send_won(self, message, number_won):
         self.__send('won', message, number_won)
@@ -48,4 +49,7 @@ class Notification:
         else:
             logger.error(f"Pushover notification failed. Code {response.getcode()}: {response.read().decode()}")
             success = False
-        NotificationHelper.insert(type_of_error, f"{message}", 'pushover', success, number_won)
+        if self.database_writer:
+            self.database_writer.insert_notification(type_of_error, f"{message}", 'pushover', success, number_won)
+        else:
+            NotificationHelper.insert(type_of_error, f"{message}", 'pushover', success, number_won)
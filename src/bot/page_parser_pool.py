@@ -0,0 +1,64 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .account_state import AccountState
+from .giveaway_entry import GiveawayEntry, list_page_rows
+from .html_parser import HtmlParser
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+_worker_parser = None
+
+
+class ParsedPage:
+    # what a worker sends back for a giveaway list page. only plain values and detached records so it is
+    # cheap to pickle, never the tree itself
+
+    __slots__ = ('nav', 'all_count', 'pinned_count', 'giveaways')
+
+    def __init__(self, nav, all_count, pinned_count, giveaways):
+        self.nav = nav
+        self.all_count = all_count
+        self.pinned_count = pinned_count
+        self.giveaways = giveaways
+
+
+def _init_worker(backend):
+    global _worker_parser
+    # the workers share the log files with the bot, so leave the per-row debug logging to the bot itself
+    logging.disable(logging.INFO)
+    _worker_parser = HtmlParser(backend)
+
+
+def parse_giveaway_list(markup, now):
+    soup = _worker_parser.parse_giveaway_list(markup)
+    nav = AccountState.read_nav(soup)
+    all_count, pinned_count, unentered = list_page_rows(soup)
+    giveaways = []
+    for item in unentered:
+        giveaway = GiveawayEntry(item, now)
+        giveaway.load_details()
+        giveaway.detach()
+        giveaways.append(giveaway)
+    soup.release()
+    return ParsedPage(nav, all_count, pinned_count, giveaways)
+
+
+class PageParserPool:
+
+    # parses giveaway list pages on separate processes so deep scans aren't held up by the GIL. the workers are
+    # spawned rather than forked: the pool starts its processes lazily, by which time the bot has its scheduler,
+    # web server and database threads, and a forked child could inherit one of their locks held
+    def __init__(self, backend, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,),
+                                             mp_context=multiprocessing.get_context('spawn'))
+        logger.debug(f"Started {workers} page parser process(es) using '{backend}'")
+
+    def parse(self, markup, now):
+        return self._executor.submit(parse_giveaway_list, markup, now).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
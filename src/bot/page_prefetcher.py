@@ -0,0 +1,50 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class PagePrefetcher:
+
+    def __init__(self, fetch_page, page_url, lookahead=1, workers=1):
+        self._fetch_page = fetch_page
+        self._page_url = page_url
+        self._lookahead = max(0, int(lookahead))
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix='page-prefetch')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # yields (page number, parsed page) in order while downloading and parsing up to `lookahead`
+    # pages ahead in the background. pages past the one the caller stopped at are cancelled on close
+    def pages(self, first_page, last_page):
+        next_page = first_page
+        try:
+            while True:
+                while len(self._pending) <= self._lookahead and next_page < last_page:
+                    url = self._page_url(next_page)
+                    logger.debug(f"Queueing page {next_page} for prefetch: {url}")
+                    self._pending.append((next_page, self._executor.submit(self._fetch_page, url)))
+                    next_page += 1
+                if not self._pending:
+                    return
+                n, future = self._pending.popleft()
+                yield n, future.result()
+        finally:
+            self._cancel_pending()
+
+    def close(self):
+        self._cancel_pending()
+        self._executor.shutdown(wait=False)
+
+    def _cancel_pending(self):
+        while self._pending:
+            n, future = self._pending.popleft()
+            if future.cancel():
+                logger.debug(f"Cancelled prefetch of page {n}")
@@ -0,0 +1,66 @@
+import threading
+from random import uniform
+from time import monotonic, sleep
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# the longest we back off for after steamgifts.com answers with errors, in seconds
+MAX_BACKOFF_SECONDS = 300
+
+
+class RateLimiter:
+
+    # a token bucket shared by every request made for an account. a token is added every 60 / requests_per_minute
+    # seconds up to `burst`, each request takes one and waits for it when there are none left. a random
+    # 0 - `jitter_seconds` is added on top so the requests don't tick like a clock
+    def __init__(self, requests_per_minute, burst=1, jitter_seconds=0):
+        self._lock = threading.Lock()
+        self._interval = 60.0 / int(requests_per_minute)
+        self._burst = int(burst)
+        self._jitter_seconds = float(jitter_seconds)
+        self._tokens = float(self._burst)
+        self._updated_at = monotonic()
+        self._backoff = 0.0
+        self._blocked_until = 0.0
+        self._wait_count = 0
+        self._wait_time = 0.0
+        self._backoff_count = 0
+
+    # blocks until the request may be sent. tokens are taken under the lock and the waiting happens outside of
+    # it, so threads queue up behind each other in the order they asked
+    def acquire(self):
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) / self._interval)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = max(-self._tokens * self._interval, self._blocked_until - now, 0)
+            if self._jitter_seconds:
+                wait += uniform(0, self._jitter_seconds)
+            if wait > 0:
+                self._wait_count += 1
+                self._wait_time += wait
+        if wait > 0:
+            logger.debug(f"Rate limiter waiting {wait:.2f}s")
+            sleep(wait)
+        return wait
+
+    # 429 and 5xx responses double the backoff (or use the server's Retry-After) and hold every request back
+    # until it has passed. each successful response halves it again
+    def report(self, status_code, retry_after=None):
+        with self._lock:
+            if status_code == 429 or status_code >= 500:
+                self._backoff = min(MAX_BACKOFF_SECONDS, max(self._backoff * 2, self._interval * 2))
+                delay = retry_after if retry_after is not None else self._backoff
+                self._blocked_until = max(self._blocked_until, monotonic() + delay)
+                self._backoff_count += 1
+                logger.warning(f"🐢 steamgifts.com answered {status_code}. Holding requests back for {delay:.0f}s.")
+            elif self._backoff:
+                self._backoff = self._backoff / 2 if self._backoff / 2 >= self._interval else 0.0
+
+    def summary(self):
+        with self._lock:
+            return f"waited {self._wait_time:.2f}s over {self._wait_count} request(s), " \
+                   f"backed off {self._backoff_count} time(s)"
@@ -1,8 +1,8 @@
-import os
-
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.blocking import BlockingScheduler
 
+from .database import get_engine
 from .log import get_logger
 
 logger = get_logger(__name__)
@@ -11,8 +11,12 @@ logger = get_logger(__name__)
 class Scheduler:
     class __Scheduler:
         def __init__(self):
+            self._database_store = SQLAlchemyJobStore(engine=get_engine())
+            # jobs whose runners hold clients, locks and threads can't be pickled into the database. they are
+            # added again on every start so they live in memory
             jobstores = {
-                'default': SQLAlchemyJobStore(url=f"{os.getenv('BOT_DB_URL', 'sqlite:///./config/sqlite.db')}")
+                'default': self._database_store,
+                'memory': MemoryJobStore()
             }
             job_defaults = {
                 'coalesce': True,
@@ -20,6 +24,15 @@ class Scheduler:
             }
             self.scheduler = BlockingScheduler(jobstores=jobstores, job_defaults=job_defaults)
 
+        # drops jobs left in the database store by versions that kept them there, so they don't run next to the
+        # ones now kept in memory under the same ids
+        def remove_stored_jobs(self, *job_ids):
+            jobs_table = self._database_store.jobs_t
+            engine = self._database_store.engine
+            jobs_table.create(engine, checkfirst=True)
+            with engine.begin() as connection:
+                connection.execute(jobs_table.delete().where(jobs_table.c.id.in_(job_ids)))
+
         def __getattr__(self, name):
             return getattr(self.scheduler, name)
 
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+class SeenGiveaways:
+
+    # the giveaways the runners have already evaluated and written, so the ones showing up again on the other feed
+    # or the next run aren't evaluated and upserted again. each code keeps the feeds that rejected it and the entries
+    # and end time that was decided on, so a giveaway that changed is evaluated and written as new. holds at most
+    # max_size codes for ttl_minutes, dropping the least recently seen first. a max_size of 0 turns it off
+    def __init__(self, max_size=0, ttl_minutes=0):
+        self._max_size = int(max_size)
+        self._ttl_seconds = int(ttl_minutes) * 60
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _fingerprint(giveaway):
+        return giveaway.game_entries, giveaway.time_remaining_timestamp
+
+    # the feeds that rejected this giveaway as it is now, empty when it was only written. None when it wasn't seen
+    # like this before
+    def rejected_by(self, giveaway):
+        if not self._max_size or not giveaway.has_details:
+            return None
+        with self._lock:
+            seen = self._seen.get(giveaway.giveaway_game_id)
+            if seen is not None:
+                fingerprint, rejected_by, expires_at = seen
+                if expires_at > monotonic() and fingerprint == self._fingerprint(giveaway):
+                    self._seen.move_to_end(giveaway.giveaway_game_id)
+                    self._hits += 1
+                    return rejected_by
+                del self._seen[giveaway.giveaway_game_id]
+            self._misses += 1
+            return None
+
+    # remembers the giveaway was written as it is now and, with a feed, that the feed rejected it
+    def remember(self, giveaway, rejected_by=None):
+        if not self._max_size or not giveaway.has_details:
+            return
+        fingerprint = self._fingerprint(giveaway)
+        with self._lock:
+            feeds = frozenset() if rejected_by is None else frozenset((rejected_by,))
+            seen = self._seen.get(giveaway.giveaway_game_id)
+            if seen is not None and seen[0] == fingerprint:
+                feeds |= seen[1]
+            self._seen[giveaway.giveaway_game_id] = (fingerprint, feeds, monotonic() + self._ttl_seconds)
+            self._seen.move_to_end(giveaway.giveaway_game_id)
+            while len(self._seen) > self._max_size:
+                self._seen.popitem(last=False)
+                self._evictions += 1
+
+    def summary(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            hit_rate = self._hits / lookups * 100 if lookups else 0
+            return f"{len(self._seen)}/{self._max_size} giveaways, {self._hits} hits / {lookups} lookups " \
+                   f"({hit_rate:.0f}%), {self._evictions} evicted"
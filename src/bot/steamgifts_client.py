@@ -0,0 +1,92 @@
+import threading
+from time import perf_counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# with a rate limiter, 429 and 5xx responses are retried here so every attempt waits on the limiter and backs it
+# off. urllib3 only retries the failed connections and reads, or the 5xx responses when there is no limiter
+RATE_LIMITED_RETRIES = 3
+RETRIED_STATUSES = (429, 500, 502, 503, 504)
+
+
+class SteamGiftsClient:
+
+    def __init__(self, cookie, user_agent, retries=5, backoff_factor=0.3, rate_limiter=None):
+        self.base_url = "https://www.steamgifts.com"
+        self._rate_limiter = rate_limiter
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._request_time = 0.0
+        self._max_request_time = 0.0
+
+        self._session = requests.Session()
+        self._session.headers.update({'User-Agent': user_agent})
+        self._session.cookies.set('PHPSESSID', cookie, domain='.steamgifts.com')
+        retry = Retry(
+            total=retries,
+            read=retries,
+            connect=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=() if rate_limiter else (500, 502, 504),
+            respect_retry_after_header=rate_limiter is None,
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def get(self, url):
+        return self._request('GET', url)
+
+    def post(self, url, data):
+        return self._request('POST', url, data=data)
+
+    def _request(self, method, url, **kwargs):
+        for attempt in range(RATE_LIMITED_RETRIES + 1):
+            if self._rate_limiter:
+                self._rate_limiter.acquire()
+            response = self._timed_request(method, url, **kwargs)
+            if self._rate_limiter:
+                self._rate_limiter.report(response.status_code, self._retry_after(response))
+            if response.status_code not in RETRIED_STATUSES or not self._rate_limiter:
+                break
+            # a POST that got a 5xx may still have gone through, so only one the site turned away with a 429 is sent
+            # again, like urllib3 never retried POSTs
+            if method == 'POST' and response.status_code != 429:
+                break
+        return response
+
+    def _timed_request(self, method, url, **kwargs):
+        start = perf_counter()
+        try:
+            return self._session.request(method, url, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                self._request_count += 1
+                self._request_time += elapsed
+                self._max_request_time = max(self._max_request_time, elapsed)
+            logger.debug(f"{method} {url} took {elapsed * 1000:.0f}ms")
+
+    @staticmethod
+    def _retry_after(response):
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return None
+
+    def timing_summary(self):
+        with self._lock:
+            count = self._request_count
+            total = self._request_time
+            slowest = self._max_request_time
+        average = (total / count) if count else 0
+        summary = f"{count} request(s) in {total:.2f}s (avg {average * 1000:.0f}ms, max {slowest * 1000:.0f}ms)"
+        if self._rate_limiter:
+            summary = f"{summary}, rate limiter {self._rate_limiter.summary()}"
+        return summary
@@ -0,0 +1,39 @@
+from .database import GiveawayHelper
+from .log import get_logger
+from .watermarked_list import WatermarkedList
+
+logger = get_logger(__name__)
+
+# the bot state key of the entered list's watermark
+ENTERED_WATERMARK_KEY = 'entered_giveaways_watermark'
+# the most pages of the entered list read in one sync
+MAX_ENTERED_PAGES = 10
+
+
+class SyncEnteredGiveaways:
+
+    # brings the entries made outside of the bot (or lost by it) into the database and the shared entered giveaways
+    # so they are never POSTed again. the entered list is newest first so only the entries since the last sync are read
+    def __init__(self, steamgifts_client, account_state, entered_giveaways, html_parser=None):
+        self._entered = entered_giveaways
+        self._entered_list = WatermarkedList(steamgifts_client, account_state, '/giveaways/entered',
+                                             'div.table__row-inner-wrap a.table__column__heading',
+                                             ENTERED_WATERMARK_KEY, MAX_ENTERED_PAGES, html_parser)
+
+    def start(self):
+        self._entered.prune()
+        self._sync_entered_giveaways()
+
+    @staticmethod
+    def _read_row(heading):
+        giveaway_id = heading['href'].split('/')[2]
+        return giveaway_id, giveaway_id
+
+    def _sync_entered_giveaways(self):
+        entered = self._entered_list.read_new(self._read_row)
+        for giveaway_id in entered:
+            self._entered.add(giveaway_id)
+        marked = GiveawayHelper.mark_games_as_entered(entered) if entered else []
+        logger.info(f"🔁 Synced {len(entered)} entered giveaway(s) from steamgifts.com. {len(marked)} weren't "
+                    f"recorded as entered yet.")
+        self._entered_list.mark_read()
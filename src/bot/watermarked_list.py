@@ -0,0 +1,73 @@
+from time import monotonic
+
+from .database import StateHelper
+from .enter_giveaways import SteamGiftsException
+from .html_parser import HtmlParser
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class WatermarkedList:
+
+    # reads a paginated list on steamgifts.com that is newest first, like the won and entered giveaways, only down to
+    # the newest row read last time. that row's giveaway code is the watermark, kept in the bot state under
+    # `watermark_key`. at most `max_pages` pages are read, which only matters the first time a list is read
+    def __init__(self, steamgifts_client, account_state, path, row_selector, watermark_key, max_pages,
+                 html_parser=None):
+        self._client = steamgifts_client
+        self._account = account_state
+        self._row_selector = row_selector
+        self._watermark_key = watermark_key
+        self._max_pages = max_pages
+        self._parser = html_parser or HtmlParser()
+        self._newest = None
+
+        self._base = f"{self._client.base_url}{path}"
+
+    def _get_soup_from_page(self, url):
+        fetched_at = monotonic()
+        r = self._client.get(url)
+        soup = self._parser.parse(r.text)
+        if not self._account.update_from_soup(soup, fetched_at):
+            logger.error("⛔⛔⛔  Cookie is not valid. A new one must be added.⛔⛔⛔")
+            raise SteamGiftsException("Cookie is not valid. A new one must be added.")
+        return soup
+
+    def _page_url(self, page):
+        return self._base if page == 1 else f"{self._base}/search?page={page}"
+
+    @staticmethod
+    def _has_next_page(soup):
+        return any(link.text.strip() == 'Next' for link in soup.select('div.pagination__navigation a span'))
+
+    # returns what `read_row` makes of every row newer than the watermark, newest first. `read_row` takes a node
+    # matched by `row_selector` and returns (giveaway code, value). the watermark only moves once mark_read() is
+    # called, so rows that couldn't be handled are read again next time
+    def read_new(self, read_row):
+        watermark = StateHelper.get(self._watermark_key)
+        self._newest = None
+        rows = []
+        for page in range(1, self._max_pages + 1):
+            soup = self._get_soup_from_page(self._page_url(page))
+            reached_watermark = False
+            for item in soup.select(self._row_selector):
+                giveaway_id, value = read_row(item)
+                if self._newest is None:
+                    self._newest = giveaway_id
+                if giveaway_id == watermark:
+                    reached_watermark = True
+                    break
+                rows.append(value)
+            has_next_page = self._has_next_page(soup)
+            soup.release()
+            if reached_watermark or not has_next_page:
+                break
+        if self._newest == watermark:
+            self._newest = None
+        return rows
+
+    def mark_read(self):
+        if self._newest is not None:
+            StateHelper.set(self._watermark_key, self._newest)
+            self._newest = None
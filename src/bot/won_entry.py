@@ -13,8 +13,8 @@ class WonEntry:
         self.giveaway_uri = None
 
         logger.debug(f"Won Giveaway html: {soup_item}")
-        self.game_name = soup_item.find('a', {'class': 'table__column__heading'}).text
-        self.giveaway_game_id = soup_item.find('a', {'class': 'table__column__heading'})['href'].split('/')[2]
+        self.game_name = soup_item.select_one('a.table__column__heading').text
+        self.giveaway_game_id = soup_item.select_one('a.table__column__heading')['href'].split('/')[2]
         self.giveaway_uri = soup_item.select_one('a.table__column__heading')['href']
         logger.debug(f"Scraped Won Giveaway: {self}")
 
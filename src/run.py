@@ -1,4 +1,6 @@
 import os
+import signal
+import sys
 from time import sleep
 
 from src.bot.log import get_logger
@@ -6,7 +8,8 @@ from src.bot.config_reader import ConfigReader, ConfigException
 from src.bot.enter_giveaways import SteamGiftsException
 from src.bot.giveaway_thread import GiveawayThread
 from src.bot.notification import Notification
-from src.bot.database import run_db_migrations
+from src.bot.database import run_db_migrations, configure_engine, StatsHelper, SteamItemHelper
+from src.bot.database_writer import DatabaseWriter
 from src.web.webserver_thread import WebServerThread
 
 logger = get_logger(__name__)
@@ -15,8 +18,16 @@ db_url = f"{os.getenv('BOT_DB_URL', 'sqlite:///./config/sqlite.db')}"
 alembic_migration_files = os.getenv('BOT_ALEMBIC_CONFIG_DIR', './src/alembic')
 
 
+# docker stop sends SIGTERM, which python ignores when it runs as PID 1 in the container. exiting instead lets run()
+# stop the giveaway thread and write whatever is still queued before the bot goes down
+def _exit_on_sigterm(signum, frame):
+    logger.info("Received SIGTERM. Shutting down the Steamgifts bot.")
+    sys.exit(0)
+
+
 def run():
     logger.info("Starting Steamgifts bot.")
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
 
     config = None
     try:
@@ -30,15 +41,22 @@ def run():
         exit(-1)
 
     config.read(config_file_name)
+    configure_engine(config['DATABASE'])
+    SteamItemHelper.warm()
+    database_writer = DatabaseWriter(config['DATABASE'].getint('database.write_queue_size'),
+                                     config['DATABASE'].getint('database.write_batch_size'),
+                                     config['DATABASE'].getint('database.write_flush_seconds'))
+    database_writer.start()
 
-    notification = Notification(config['NOTIFICATIONS'].get('notification.prefix'))
+    notification = Notification(config['NOTIFICATIONS'].get('notification.prefix'), database_writer)
     pushover_enabled = config['NOTIFICATIONS'].getboolean('pushover.enabled')
     pushover_token = config['NOTIFICATIONS'].get('pushover.token')
     pushover_user_key = config['NOTIFICATIONS'].get('pushover.user_key')
     if pushover_enabled:
         notification.enable_pushover(pushover_token, pushover_user_key)
+    g = None
     try:
-        g = GiveawayThread(config, notification)
+        g = GiveawayThread(config, notification, database_writer)
         g.setName("Giveaway Enterer")
         g.start()
 
@@ -58,6 +76,11 @@ def run():
         notification.send_error("Something happened and the bot had to quit!")
         sleep(10)
         exit(-1)
+    finally:
+        if g is not None:
+            g.stop()
+        # whatever is still queued is written before the bot goes down
+        database_writer.close()
 
 
 def entry():
@@ -74,6 +97,11 @@ def entry():
         -------------------------------------------------------------------------------------
         """)
     run_db_migrations(alembic_migration_files, db_url)
+    if '--rebuild-stats' in sys.argv:
+        logger.info("📊 Rebuilding the giveaway stats from the giveaway table.")
+        StatsHelper.rebuild()
+        logger.info("📊 Giveaway stats rebuilt.")
+        return
     run()
 
 
@@ -2,9 +2,10 @@ import os
 import threading
 from threading import Thread
 
+from flask import redirect, request, url_for
 from flask_basicauth import BasicAuth
 
-from src.bot.database import NotificationHelper, GiveawayHelper
+from src.bot.database import NotificationHelper, GiveawayHelper, StatsHelper
 from src.bot.log import get_logger
 
 logger = get_logger(__name__)
@@ -63,19 +64,26 @@ class WebServerThread(threading.Thread):
 
         @app.route(f"{self.app_root}notifications")
         def db_notifications():
-            return render_template('notifications.html', name=self.prefix, data=NotificationHelper.get())
+            data = NotificationHelper.page(after=request.args.get('after', type=int),
+                                           before=request.args.get('before', type=int))
+            return render_template('notifications.html', name=self.prefix, data=data)
+
+        @app.route(f"{self.app_root}giveaways", methods=['GET'])
+        def db_giveaways():
+            data = GiveawayHelper.page(after=request.args.get('after', type=int),
+                                       before=request.args.get('before', type=int))
+            return render_template('giveaways.html', name=self.prefix, data=data)
 
-        @app.route(f"{self.app_root}giveaways", methods=['GET'], defaults={"page": 1})
         @app.route(f"{self.app_root}giveaways/<int:page>", methods=['GET'])
-        def db_giveaways(page):
-            return render_template('giveaways.html', name=self.prefix, data=GiveawayHelper.paginate(page=page))
+        def db_giveaways_by_number(page):
+            return redirect(url_for('db_giveaways', after=GiveawayHelper.page_cursor(page)))
 
         @app.route(f"{self.app_root}stats")
         def stats():
-            totals = GiveawayHelper.total_giveaways()
-            entered = GiveawayHelper.total_entered()
-            won = GiveawayHelper.total_won()
-            return render_template('stats.html', name=self.prefix, totals=totals, entered=entered, won=won)
+            totals = StatsHelper.totals()
+            return render_template('stats.html', name=self.prefix, totals=totals['giveaways'],
+                                   entered=totals['entered'], won=totals['won'], points_spent=totals['points_spent'],
+                                   daily=StatsHelper.daily())
 
         if self.enabled:
             logger.info("Webserver Enabled. Running")
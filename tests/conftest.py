@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# the bot logs to files in BOT_CONFIG_DIR and opens the database at BOT_DB_URL as soon as it is imported, so point
+# both at a scratch directory instead of ./config
+_scratch = tempfile.mkdtemp(prefix='steamgifts-bot-tests-')
+os.environ.setdefault('BOT_CONFIG_DIR', _scratch)
+os.environ.setdefault('BOT_DB_URL', f"sqlite:///{_scratch}/sqlite.db")
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from src.bot.account_state import AccountState
+from src.bot.giveaway_entry import GiveawayEntry, list_page_rows
+from src.bot.html_parser import HtmlParser, PARSER_BACKENDS
+from src.bot.won_entry import WonEntry
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+# the time the giveaway list fixtures are scraped at, so the minutes remaining and created never change
+SCRAPED_AT = 1792314984
+GIVEAWAY_FIELDS = [f for f in GiveawayEntry.__slots__ if f[0] != '_']
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _parser(backend):
+    parser = HtmlParser(backend)
+    if parser.backend != backend:
+        pytest.skip(f"'{backend}' is not installed")
+    return parser
+
+
+def _giveaway_list(soup):
+    all_count, pinned_count, unentered = list_page_rows(soup)
+    giveaways = []
+    for item in unentered:
+        giveaway = GiveawayEntry(item, SCRAPED_AT)
+        giveaway.load_details()
+        giveaways.append({field: getattr(giveaway, field) for field in GIVEAWAY_FIELDS})
+    return {
+        'nav': list(AccountState.read_nav(soup)),
+        'all_count': all_count,
+        'pinned_count': pinned_count,
+        'giveaways': giveaways
+    }
+
+
+# what every backend has to scrape off the fixture pages. regenerate golden_pages.json with _scrape('html.parser')
+# only when the fixtures or the scrapers change on purpose
+def _scrape(backend, list_parse=False):
+    parser = _parser(backend)
+    parse = parser.parse_giveaway_list if list_parse else parser.parse
+    won = parser.parse(_fixture('won.html'))
+    return {
+        'search': _giveaway_list(parse(_fixture('search.html'))),
+        'home': _giveaway_list(parse(_fixture('home.html'))),
+        'won': [{'game_name': w.game_name, 'giveaway_game_id': w.giveaway_game_id, 'giveaway_uri': w.giveaway_uri}
+                for w in (WonEntry(item) for item in won.select('div[class=table__row-inner-wrap]'))]
+    }
+
+
+@pytest.fixture(scope='module')
+def golden():
+    return json.loads(_fixture('golden_pages.json'))
+
+
+@pytest.mark.parametrize('backend', PARSER_BACKENDS)
+def test_backend_scrapes_the_golden_output(backend, golden):
+    assert _scrape(backend) == golden
+
+
+@pytest.mark.parametrize('backend', PARSER_BACKENDS)
+def test_giveaway_list_parse_scrapes_the_golden_output(backend, golden):
+    scraped = _scrape(backend, list_parse=True)
+    assert scraped['search'] == golden['search']
+    assert scraped['home'] == golden['home']
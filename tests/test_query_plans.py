@@ -0,0 +1,67 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from src.bot import database
+from src.bot.database import GiveawayHelper, NotificationHelper, run_db_migrations
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'alembic')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    run_db_migrations(ALEMBIC_DIR, database.db_url)
+    return database.get_engine()
+
+
+# runs `call` and returns sqlite's query plan for every SELECT and UPDATE it sent, one string per statement
+def _query_plans(engine, call):
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE')):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        call()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    with engine.connect() as connection:
+        return [' / '.join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}",
+                                                                         parameters))
+                for statement, parameters in statements]
+
+
+@pytest.mark.parametrize('call, index', [
+    (lambda: GiveawayHelper.get_by_ids(SimpleNamespace(giveaway_game_id='AbCdE')), 'ix_giveaway_giveaway_id'),
+    (lambda: GiveawayHelper.mark_games_as_won(['AbCdE', 'FgHiJ']), 'ix_giveaway_giveaway_id'),
+    (lambda: GiveawayHelper.mark_games_as_entered(['AbCdE', 'FgHiJ']), 'ix_giveaway_giveaway_id'),
+    (GiveawayHelper.get_open_entered, 'ix_giveaway_entered'),
+    (NotificationHelper.get_won_notifications, 'ix_notification_type_created_at'),
+    (NotificationHelper.get_error_notifications, 'ix_notification_type_created_at'),
+    (NotificationHelper.get_won_notifications_today, 'ix_notification_type_created_at'),
+])
+def test_lookups_search_an_index(engine, call, index):
+    plans = _query_plans(engine, call)
+    assert plans
+    for plan in plans:
+        assert plan.startswith('SEARCH') and f"USING INDEX {index}" in plan
+
+
+@pytest.mark.parametrize('page, index', [
+    (lambda: GiveawayHelper.page(), 'ix_giveaway_giveaway_ended_at_id'),
+    (lambda: GiveawayHelper.page(after=5), 'ix_giveaway_giveaway_ended_at_id'),
+    (lambda: GiveawayHelper.page(before=5), 'ix_giveaway_giveaway_ended_at_id'),
+    (lambda: NotificationHelper.page(), 'ix_notification_created_at_id'),
+    (lambda: NotificationHelper.page(after=5), 'ix_notification_created_at_id'),
+    (lambda: NotificationHelper.page(before=5), 'ix_notification_created_at_id'),
+])
+def test_keyset_pages_are_read_in_index_order(engine, page, index):
+    plans = _query_plans(engine, page)
+    assert len(plans) == 1
+    assert f"USING INDEX {index}" in plans[0]
+    # the rows come off the index already in order, so there is no sort of the whole table
+    assert 'TEMP B-TREE' not in plans[0]